@@ -9,16 +9,18 @@ The CLI design tries to mimic package managers - hence install/remove commands.
 import sys
 import os
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 import click
 
 from .config import ConfigManager
 from .git_ops import GitRepository
-from .user_manager import UserManager
+from .user_manager import USERNAME_RE, UserManager
 from .sudo_manager import SudoManager
 from . import __version__
 
+_PACKAGE_TYPES = frozenset({"user", "sudo"})
+
 
 def setup_logging(verbose: bool = False) -> None:
     """Setup logging configuration."""
@@ -30,6 +32,38 @@ def setup_logging(verbose: bool = False) -> None:
     )
 
 
+_SERVICE_FACTORIES = {
+    "config": lambda ctx: ConfigManager(),
+    "git": lambda ctx: GitRepository(_get_service(ctx, "config")),
+    "user": lambda ctx: UserManager(),
+    "sudo": lambda ctx: SudoManager(_get_service(ctx, "user")),
+}
+
+
+def _get_service(ctx: click.Context, name: str) -> Any:
+    """Get a manager instance, building it at most once per invocation.
+
+    Commands share these through ctx.obj so the config file is loaded and
+    the addy directories are checked only once, however many managers need
+    them.
+    """
+    services = ctx.obj.setdefault("_services", {})
+    if name not in services:
+        _ensure_logging(ctx)
+        services[name] = _SERVICE_FACTORIES[name](ctx)
+    return services[name]
+
+
+def _ensure_logging(ctx: click.Context) -> None:
+    """Set up logging the first time a command needs it.
+
+    Commands like version and --help never log, so they skip the setup.
+    """
+    if not ctx.obj.get("_logging_ready"):
+        setup_logging(ctx.obj.get("verbose", False))
+        ctx.obj["_logging_ready"] = True
+
+
 def check_root() -> None:
     """Check if running as root."""
     if os.geteuid() != 0:
@@ -42,9 +76,11 @@ def check_root() -> None:
 @click.pass_context
 def cli(ctx, verbose):
     """Addy - Git-Driven SSH Access Control"""
-    setup_logging(verbose)
     ctx.ensure_object(dict)
     ctx.obj["verbose"] = verbose
+    ctx.obj["_services"] = {}
+    if verbose:
+        _ensure_logging(ctx)
 
 
 @cli.group()
@@ -52,7 +88,7 @@ def cli(ctx, verbose):
 def config(ctx):
     """Manage addy configuration"""
     check_root()
-    ctx.obj["config"] = ConfigManager()
+    ctx.obj["config"] = _get_service(ctx, "config")
 
 
 @config.command("set")
@@ -94,38 +130,54 @@ def config_list(ctx):
 
 
 @cli.command()
-@click.argument("package")
+@click.argument("packages", nargs=-1, required=True)
 @click.pass_context
-def install(ctx, package: str):
-    """Install a user or sudo package"""
+def install(ctx, packages: tuple[str, ...]):
+    """Install one or more user or sudo packages
+
+    Examples:
+      sudo addy install user/alice
+      sudo addy install user/alice user/bob sudo/alice
+    """
     check_root()
 
     try:
-        package_type, username = _parse_package(package)
+        # Reject bad input before touching the network
+        parsed = [_parse_package(package) for package in packages]
 
-        config_manager = ConfigManager()
-        git_repo = GitRepository(config_manager)
-        user_manager = UserManager()
-        sudo_manager = SudoManager(user_manager)
+        git_repo = _get_service(ctx, "git")
+        user_manager = _get_service(ctx, "user")
+        sudo_manager = _get_service(ctx, "sudo")
 
-        click.echo(f"Installing package: {package}")
-
-        # Sync repository
+        # Sync repository once for the whole batch
         git_repo.sync()
 
-        if package_type == "user":
-            # Get public key
-            public_key = git_repo.get_public_key(username)
+        # Get public keys up front, so a missing key stops the batch before
+        # any account is created
+        public_keys = {
+            username: git_repo.get_public_key(username)
+            for package_type, username in parsed
+            if package_type == "user"
+        }
 
-            # Create user and install SSH key
-            user_manager.create_user(username)
-            user_manager.install_ssh_key(username, public_key)
+        usernames = list(dict.fromkeys(username for _, username in parsed))
+        if len(usernames) > 1:
+            # One newusers run instead of a useradd per account
+            user_manager.create_users_bulk(usernames)
 
-        elif package_type == "sudo":
-            # Grant sudo access (create user if needed)
-            sudo_manager.grant_sudo(username, create_user=True)
+        for package, (package_type, username) in zip(packages, parsed):
+            click.echo(f"Installing package: {package}")
+
+            if package_type == "user":
+                # Create user and install SSH key
+                user_manager.create_user(username)
+                user_manager.install_ssh_key(username, public_keys[username])
+
+            elif package_type == "sudo":
+                # Grant sudo access (create user if needed)
+                sudo_manager.grant_sudo(username, create_user=True)
 
-        click.echo(f"Package {package} installed successfully")
+            click.echo(f"Package {package} installed successfully")
 
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -158,8 +210,8 @@ def remove(ctx, package: str, remove_user: bool, delete_account: bool):
     try:
         package_type, username = _parse_package(package)
 
-        user_manager = UserManager()
-        sudo_manager = SudoManager(user_manager)
+        user_manager = _get_service(ctx, "user")
+        sudo_manager = _get_service(ctx, "sudo")
 
         # Validate flags - remove_user only works with sudo packages
         if remove_user and package_type != "sudo":
@@ -196,8 +248,7 @@ def sync(ctx):
     check_root()
 
     try:
-        config_manager = ConfigManager()
-        git_repo = GitRepository(config_manager)
+        git_repo = _get_service(ctx, "git")
         git_repo.sync()
         click.echo("Repository synced successfully")
 
@@ -223,13 +274,10 @@ def _parse_package(package: str) -> tuple[str, str]:
 
     package_type, username = parts
 
-    if package_type not in ["user", "sudo"]:
+    if package_type not in _PACKAGE_TYPES:
         raise ValueError("Package type must be 'user' or 'sudo'")
 
-    if (
-        not username
-        or not username.replace("-", "").replace("_", "").replace(".", "").isalnum()
-    ):
+    if not USERNAME_RE.fullmatch(username):
         raise ValueError(f"Invalid username: {username}")
 
     return package_type, username
@@ -6,14 +6,49 @@ human readability and structure. The /etc/addy location follows Unix conventions
 """
 
 import os
+import json
 import yaml
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set, Tuple
+
+# libyaml bindings are much faster than the pure-Python parser, but only
+# exist when PyYAML was built against libyaml
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
 
 logger = logging.getLogger(__name__)
 
+# Parsed configs shared across ConfigManager instances, keyed by
+# (config file path, mtime_ns, size) so an edited file is re-read.
+_PARSED_CACHE: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+# Directories already created by this process, so repeat instances skip mkdir
+_ensured_dirs: Set[Path] = set()
+
+
+def ensure_dir(path: Path, kind: str) -> None:
+    """Ensure one of addy's private directories exists, once per process.
+
+    Args:
+        path: Directory to create, readable by root only
+        kind: What the directory holds, for messages ("config", "repo")
+
+    Raises:
+        RuntimeError: If the directory can't be created
+    """
+    if path in _ensured_dirs:
+        return
+
+    try:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        logger.debug(f"Using {kind} directory: {path}")
+    except PermissionError:
+        raise RuntimeError(f"Permission denied creating {kind} directory: {path}")
+
+    _ensured_dirs.add(path)
+
 
 class ConfigManager:
     """Manages addy configuration."""
@@ -30,49 +65,120 @@ class ConfigManager:
         self.config_dir = Path(config_dir or self.DEFAULT_CONFIG_DIR)
         self.config_file = self.config_dir / self.DEFAULT_CONFIG_FILE
         self._config_cache: Optional[Dict[str, Any]] = None
+        # Resolved values for the typed getters, cleared whenever config is saved
+        self._memo: Dict[str, Any] = {}
 
-        self._ensure_config_dir()
-
-    def _ensure_config_dir(self) -> None:
-        """Ensure configuration directory exists with proper permissions."""
-        try:
-            self.config_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
-            logger.debug(f"Configuration directory: {self.config_dir}")
-        except PermissionError:
-            raise RuntimeError(
-                f"Permission denied creating config directory: {self.config_dir}"
-            )
+        ensure_dir(self.config_dir, "config")
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file."""
         if self._config_cache is not None:
             return self._config_cache
 
-        if not self.config_file.exists():
+        try:
+            key = self._cache_key()
+        except FileNotFoundError:
             self._config_cache = {}
             return self._config_cache
 
+        cached = _PARSED_CACHE.get(key)
+        if cached is not None:
+            self._config_cache = dict(cached)
+            return self._config_cache
+
+        sidecar = self._load_sidecar(key)
+        if sidecar is not None:
+            self._config_cache = sidecar
+            _PARSED_CACHE[key] = dict(sidecar)
+            return self._config_cache
+
         try:
             with open(self.config_file, "r") as f:
-                self._config_cache = yaml.safe_load(f) or {}
+                self._config_cache = yaml.load(f, Loader=_Loader) or {}
             logger.debug(f"Loaded configuration from {self.config_file}")
         except (yaml.YAMLError, PermissionError) as e:
             raise RuntimeError(f"Failed to load configuration: {e}")
 
+        _PARSED_CACHE[key] = dict(self._config_cache)
         return self._config_cache
 
-    def _save_config(self, config: Dict[str, Any]) -> None:
-        """Save configuration to file."""
+    def _cache_key(self) -> Tuple[str, int, int]:
+        """Build the parsed-config cache key from the config file's stat."""
+        st = os.stat(self.config_file)
+        return (str(self.config_file), st.st_mtime_ns, st.st_size)
+
+    @property
+    def _sidecar_file(self) -> Path:
+        """JSON mirror of the YAML config, used for fast reads."""
+        return self.config_file.with_name(self.config_file.name + ".json")
+
+    def _load_sidecar(self, key: Tuple[str, int, int]) -> Optional[Dict[str, Any]]:
+        """Load the JSON mirror if it was written for the current YAML file.
+
+        The mirror records the mtime and size of the YAML it was generated
+        from, so a hand-edited config.yaml is never shadowed by a stale mirror.
+        """
         try:
-            with open(self.config_file, "w") as f:
-                yaml.safe_dump(config, f, default_flow_style=False)
+            with open(self._sidecar_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("source") != list(key[1:]):
+            return None
 
-            # Set restrictive permissions
-            os.chmod(self.config_file, 0o600)
+        config = data.get("config")
+        return config if isinstance(config, dict) else None
+
+    def _save_sidecar(self, config: Dict[str, Any], key: Tuple[str, int, int]) -> None:
+        """Atomically write the JSON mirror next to the YAML config."""
+        tmp_file = self._sidecar_file.with_name(self._sidecar_file.name + ".tmp")
+        try:
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"source": list(key[1:]), "config": config}, f)
+            os.replace(tmp_file, self._sidecar_file)
+        except (OSError, TypeError, ValueError) as e:
+            # The mirror is only an optimisation; YAML stays authoritative
+            logger.debug(f"Skipping config JSON mirror: {e}")
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+    def _save_config(self, config: Dict[str, Any]) -> None:
+        """Save configuration to file.
+
+        Writes to a temporary file and renames it over the config, so a
+        crash mid-write never leaves a truncated config behind.
+        """
+        tmp_file = self.config_file.with_name(self.config_file.name + ".tmp")
+        try:
+            # Create with restrictive permissions from the start
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                # A leftover temp file keeps its old mode, so set it explicitly
+                os.fchmod(fd, 0o600)
+                yaml.dump(config, f, Dumper=_Dumper, default_flow_style=False)
+                f.flush()
+                os.fsync(fd)
+            os.replace(tmp_file, self.config_file)
             self._config_cache = config
+            self._memo.clear()
+
+            # Drop stale entries for this file and cache what we just wrote
+            key = self._cache_key()
+            for stale in [k for k in _PARSED_CACHE if k[0] == key[0]]:
+                del _PARSED_CACHE[stale]
+            _PARSED_CACHE[key] = dict(config)
+            self._save_sidecar(config, key)
             logger.debug(f"Saved configuration to {self.config_file}")
 
-        except (yaml.YAMLError, PermissionError) as e:
+        except (yaml.YAMLError, OSError) as e:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
             raise RuntimeError(f"Failed to save configuration: {e}")
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -128,6 +234,14 @@ class ConfigManager:
         """
         return self._load_config().copy()
 
+    def _get_memoized(self, key: str, default: Any = None) -> Any:
+        """Get a configuration value, remembering it until the next save."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = self.get(key, default)
+            return value
+
     def get_git_repo(self) -> str:
         """Get Git repository URL.
 
@@ -137,7 +251,7 @@ class ConfigManager:
         Raises:
             RuntimeError: If git-repo is not configured
         """
-        repo = self.get("git-repo")
+        repo = self._get_memoized("git-repo")
         if not repo:
             raise RuntimeError(
                 "Git repository not configured. Run: addy config set git-repo <repo-url>"
@@ -150,7 +264,7 @@ class ConfigManager:
         Returns:
             Git branch name (defaults to 'main')
         """
-        return self.get("git-branch", "main")
+        return self._get_memoized("git-branch", "main")
 
     def get_ssh_key_path(self) -> Optional[str]:
         """Get SSH private key path for Git access.
@@ -158,7 +272,7 @@ class ConfigManager:
         Returns:
             SSH private key path or None
         """
-        return self.get("ssh-key-path")
+        return self._get_memoized("ssh-key-path")
 
     def validate_config(self) -> Dict[str, str]:
         """Validate current configuration.
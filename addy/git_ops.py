@@ -7,19 +7,39 @@ and edge cases I discovered during testing.
 """
 
 import os
+import string
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, TYPE_CHECKING
 
-import git
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, ed25519, ec
+from .config import ConfigManager, ensure_dir
 
-from .config import ConfigManager
+if TYPE_CHECKING:
+    import git
 
 
 logger = logging.getLogger(__name__)
 
+_VALID_KEY_TYPES = frozenset(
+    {
+        "ssh-rsa",
+        "ssh-ed25519",
+        "ecdsa-sha2-nistp256",
+        "ecdsa-sha2-nistp384",
+        "ecdsa-sha2-nistp521",
+        "ssh-dss",
+    }
+)
+
+# Upper bound on a public key file; real keys are at most a few KB
+_MAX_PUBLIC_KEY_SIZE = 16 * 1024
+
+# Characters allowed in the (unpadded) base64 blob of a public key
+_BASE64_CHARS = frozenset(string.ascii_letters + string.digits + "+/")
+
+# Default for arguments where None is a meaningful value of its own
+_UNSET = object()
+
 
 class GitRepository:
     """Manages Git repository operations for user keys."""
@@ -35,25 +55,28 @@ class GitRepository:
         """
         self.config = config_manager
         self.repo_dir = Path(repo_dir or self.DEFAULT_REPO_DIR)
-        self._repo: Optional[git.Repo] = None
+        self._repo: Optional["git.Repo"] = None
 
-        self._ensure_repo_dir()
+        # Paths used on every sync/lookup, built once
+        self._users_dir = self.repo_dir / "users"
+        self._git_marker = self.repo_dir / ".git"
 
-    def _ensure_repo_dir(self) -> None:
-        """Ensure repository directory exists with proper permissions."""
-        try:
-            self.repo_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
-            logger.debug(f"Repository directory: {self.repo_dir}")
-        except PermissionError:
-            raise RuntimeError(
-                f"Permission denied creating repo directory: {self.repo_dir}"
-            )
+        ensure_dir(self.repo_dir, "repo")
 
-    def _get_git_env(self) -> dict[str, str]:
-        """Get environment variables for Git operations."""
-        env = os.environ.copy()
+    def _get_git_env(self, ssh_key_path: Any = _UNSET) -> dict[str, str]:
+        """Get environment overrides for Git operations.
 
-        ssh_key_path = self.config.get_ssh_key_path()
+        GitPython layers these on top of the process environment when it
+        spawns git, so only the variables addy changes are returned.
+
+        Args:
+            ssh_key_path: SSH private key to use, or None for no key. Read
+                from config if not given.
+        """
+        env: dict[str, str] = {}
+
+        if ssh_key_path is _UNSET:
+            ssh_key_path = self.config.get_ssh_key_path()
         if ssh_key_path:
             # Use custom SSH key for Git operations
             ssh_cmd = f"ssh -i {ssh_key_path} -o StrictHostKeyChecking=no"
@@ -64,38 +87,59 @@ class GitRepository:
 
     def sync(self) -> None:
         """Sync repository with remote."""
+        # GitPython is slow to import, so only pay for it when we touch git
+        import git
+
+        # Read config once up front; it doesn't change during a sync
         git_repo_url = self.config.get_git_repo()
         git_branch = self.config.get_git_branch()
+        ssh_key_path = self.config.get_ssh_key_path()
 
         logger.info(f"Syncing repository: {git_repo_url} (branch: {git_branch})")
 
-        env = self._get_git_env()
+        env = self._get_git_env(ssh_key_path)
 
         try:
-            if (self.repo_dir / ".git").exists():
+            if self._git_marker.exists():
                 # Repository exists, pull latest changes
                 self._repo = git.Repo(self.repo_dir)
+                on_branch = self._repo.active_branch.name == git_branch
+
+                # Most syncs are no-ops, so ask the remote for its tip before
+                # paying for a fetch
+                if on_branch and self._remote_head(self._repo, git_branch, env) == (
+                    self._repo.head.commit.hexsha
+                ):
+                    # Still discard any local edits to the checkout
+                    self._repo.git.reset("--hard", "HEAD", env=env)
+                    logger.info("Repository already up to date")
+                    return
+
+                # Pull only the tip of the branch we track; history is not needed
+                self._repo.git.fetch(
+                    "--depth=1", "--no-tags", "origin", git_branch, env=env
+                )
 
-                # Ensure we're on the correct branch
-                if self._repo.active_branch.name != git_branch:
-                    try:
-                        self._repo.git.checkout(git_branch, env=env)
-                    except git.GitCommandError:
-                        # Branch might not exist locally, create it
-                        self._repo.git.checkout(
-                            "-b", git_branch, f"origin/{git_branch}", env=env
-                        )
-
-                # Pull latest changes
-                origin = self._repo.remote("origin")
-                origin.fetch(env=env)
-                self._repo.git.reset("--hard", f"origin/{git_branch}", env=env)
+                # Each git call is a fork+exec, so move to the fetched tip in one
+                if not on_branch:
+                    # Switch branch, (re)creating it at the fetched tip
+                    self._repo.git.checkout(
+                        "-f", "-B", git_branch, "FETCH_HEAD", env=env
+                    )
+                else:
+                    self._repo.git.reset("--hard", "FETCH_HEAD", env=env)
 
                 logger.info("Repository updated successfully")
             else:
                 # Clone repository
                 self._repo = git.Repo.clone_from(
-                    git_repo_url, self.repo_dir, branch=git_branch, env=env
+                    git_repo_url,
+                    self.repo_dir,
+                    branch=git_branch,
+                    depth=1,
+                    single_branch=True,
+                    no_tags=True,
+                    env=env,
                 )
                 logger.info("Repository cloned successfully")
 
@@ -104,6 +148,24 @@ class GitRepository:
         except Exception as e:
             raise RuntimeError(f"Unexpected error syncing repository: {e}")
 
+    def _remote_head(
+        self, repo: "git.Repo", git_branch: str, env: dict[str, str]
+    ) -> Optional[str]:
+        """Get the commit the remote branch points at, without fetching.
+
+        Args:
+            repo: Repository whose origin to ask
+            git_branch: Branch to look up on origin
+            env: Environment for the git command
+
+        Returns:
+            Commit SHA, or None if the branch is not on the remote
+        """
+        output = str(
+            repo.git.ls_remote("--heads", "origin", f"refs/heads/{git_branch}", env=env)
+        )
+        return output.split()[0] if output else None
+
     def get_public_key(self, username: str) -> str:
         """Get public key for a user from the repository.
 
@@ -116,16 +178,27 @@ class GitRepository:
         Raises:
             RuntimeError: If key file not found or invalid
         """
-        key_file = self.repo_dir / "users" / f"{username}.pub"
+        key_file = self._users_dir / f"{username}.pub"
 
-        if not key_file.exists():
+        # Read with a bounded raw read; a legitimate key is well under the limit
+        try:
+            fd = os.open(key_file, os.O_RDONLY)
+            try:
+                data = os.read(fd, _MAX_PUBLIC_KEY_SIZE + 1)
+            finally:
+                os.close(fd)
+        except FileNotFoundError:
             raise RuntimeError(f"Public key not found: users/{username}.pub")
+        except OSError as e:
+            raise RuntimeError(f"Failed to read public key file: {e}")
+
+        if len(data) > _MAX_PUBLIC_KEY_SIZE:
+            raise RuntimeError(f"Public key file too large: users/{username}.pub")
 
         try:
-            with open(key_file, "r") as f:
-                key_content = f.read().strip()
-        except (IOError, PermissionError) as e:
-            raise RuntimeError(f"Failed to read public key file: {e}")
+            key_content = data.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            raise RuntimeError(f"Invalid SSH public key in users/{username}.pub")
 
         if not key_content:
             raise RuntimeError(f"Empty public key file: users/{username}.pub")
@@ -147,8 +220,9 @@ class GitRepository:
             True if valid, False otherwise
         """
         try:
-            # Basic format check
-            parts = key_content.strip().split()
+            # Basic format check. Only the type and key data matter, so stop
+            # splitting there rather than tokenising an arbitrarily long comment
+            parts = key_content.split(None, 2)
             if len(parts) < 2:
                 return False
 
@@ -156,25 +230,17 @@ class GitRepository:
             key_data = parts[1]
 
             # Check key type
-            valid_types = [
-                "ssh-rsa",
-                "ssh-ed25519",
-                "ecdsa-sha2-nistp256",
-                "ecdsa-sha2-nistp384",
-                "ecdsa-sha2-nistp521",
-                "ssh-dss",
-            ]
-
-            if key_type not in valid_types:
+            if key_type not in _VALID_KEY_TYPES:
                 logger.warning(f"Unsupported key type: {key_type}")
                 return False
 
-            # Try to decode base64 data
-            import base64
-
-            try:
-                base64.b64decode(key_data)
-            except Exception:
+            # Check the key data is well-formed base64 without decoding it
+            unpadded = key_data.rstrip("=")
+            if (
+                len(key_data) % 4
+                or len(key_data) - len(unpadded) > 2
+                or not _BASE64_CHARS.issuperset(unpadded)
+            ):
                 logger.warning("Invalid base64 encoding in public key")
                 return False
 
@@ -190,15 +256,20 @@ class GitRepository:
         Returns:
             List of usernames
         """
-        users_dir = self.repo_dir / "users"
-        if not users_dir.exists():
+        # scandir hands back names (and d_type) without building a Path or
+        # stat-ing each entry, which matters for large teams
+        try:
+            with os.scandir(self._users_dir) as entries:
+                users = [
+                    entry.name[:-4]
+                    for entry in entries
+                    if entry.name.endswith(".pub")
+                    and len(entry.name) > 4
+                    and entry.is_file()
+                ]
+        except (FileNotFoundError, NotADirectoryError):
             return []
 
-        users = []
-        for key_file in users_dir.glob("*.pub"):
-            username = key_file.stem
-            users.append(username)
-
         return sorted(users)
 
     def get_repo_info(self) -> dict[str, str]:
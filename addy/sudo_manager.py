@@ -3,20 +3,38 @@ Sudo access management for addy.
 """
 
 import os
+import re
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List
+from typing import FrozenSet, Optional, List, Union
+
+from .user_manager import MAX_IO_WORKERS, USERNAME_RE
 
 
 logger = logging.getLogger(__name__)
 
+# addy's one-line rules are well under this, so reading this much of a file
+# is enough to tell whether it is addy's
+_MAX_ADDY_RULE_SIZE = 128
+
+# Reading rules shouldn't dirty every file's inode with a new atime
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+
+# The exact rule addy writes, for a conservative set of usernames. Content
+# matching this is known-good sudoers syntax, so visudo can be skipped.
+_ADDY_RULE_RE = re.compile(rb"[a-z_][a-z0-9._-]{0,31} ALL=\(ALL\) NOPASSWD:ALL\s*")
+
 
 class SudoManager:
     """Manages sudo access for users."""
 
     SUDOERS_DIR = Path("/etc/sudoers.d")
 
+    # Everything after the username in the rule addy writes
+    _RULE_SUFFIX = b" ALL=(ALL) NOPASSWD:ALL"
+
     def __init__(self, user_manager=None):
         """Initialize sudo manager.
 
@@ -24,6 +42,8 @@ class SudoManager:
             user_manager: UserManager instance for user operations
         """
         self.user_manager = user_manager
+        # Snapshot of names in SUDOERS_DIR, taken by list_sudo_users_set()
+        self._sudoers_names: Optional[FrozenSet[str]] = None
 
     def grant_sudo(self, username: str, create_user: bool = False) -> None:
         """Grant passwordless sudo access to a user.
@@ -43,45 +63,75 @@ class SudoManager:
             else:
                 raise RuntimeError(f"User {username} does not exist")
 
-        sudoers_file = self.SUDOERS_DIR / username
+        # Plain string paths; these are only handed to os-level calls
+        sudoers_file = os.path.join(self.SUDOERS_DIR, username)
 
-        if sudoers_file.exists():
+        if os.path.lexists(sudoers_file):
             logger.info(f"Sudo access already configured for user {username}")
             return
 
         logger.info(f"Granting sudo access to user: {username}")
 
-        try:
-            # Create sudoers rule
-            sudo_rule = f"{username} ALL=(ALL) NOPASSWD:ALL\n"
+        # Create sudoers rule
+        sudo_rule = self._addy_rule(username)
 
-            # Write to temporary file first
-            temp_file = sudoers_file.with_suffix(".tmp")
-            with open(temp_file, "w") as f:
-                f.write(sudo_rule)
+        # Write to temporary file first. sudo ignores names containing a
+        # dot, so a half-written temp file is never loaded.
+        temp_file = sudoers_file + ".tmp"
+        installed = False
 
-            # Set proper permissions
-            os.chmod(temp_file, 0o440)
+        try:
+            try:
+                os.unlink(temp_file)  # Left over from an interrupted run
+            except FileNotFoundError:
+                pass
+
+            # Create with final permissions so it is never more readable
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o440)
+            try:
+                os.write(fd, sudo_rule)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
 
             # Validate the sudoers file
-            if not self._validate_sudoers_file(temp_file):
-                temp_file.unlink()
+            if not self._validate_sudoers_file(temp_file, sudo_rule):
                 raise RuntimeError(f"Invalid sudoers configuration for {username}")
 
             # Move to final location
-            temp_file.rename(sudoers_file)
-
-            logger.info(f"Sudo access granted to user {username}")
+            os.replace(temp_file, sudoers_file)
+            installed = True
 
-        except (OSError, PermissionError) as e:
-            # Clean up temporary file if it exists
-            temp_file = self.SUDOERS_DIR / f"{username}.tmp"
-            if temp_file.exists():
+        except OSError as e:
+            raise RuntimeError(f"Failed to grant sudo access to {username}: {e}")
+        finally:
+            # Never leave the temporary file behind, whatever went wrong
+            if not installed:
                 try:
-                    temp_file.unlink()
-                except:
+                    os.unlink(temp_file)
+                except OSError:
                     pass
-            raise RuntimeError(f"Failed to grant sudo access to {username}: {e}")
+
+        if self._sudoers_names is not None:
+            self._sudoers_names = self._sudoers_names | {username}
+
+        # Flush the directory entry so a crash can't leave an empty or
+        # missing sudoers file behind. The rule is already live, so a
+        # failure here doesn't undo the grant.
+        try:
+            self._fsync_sudoers_dir()
+        except OSError as e:
+            logger.warning(f"Failed to flush {self.SUDOERS_DIR} to disk: {e}")
+
+        logger.info(f"Sudo access granted to user {username}")
+
+    def _fsync_sudoers_dir(self) -> None:
+        """Flush directory entries in the sudoers directory to disk."""
+        dir_fd = os.open(self.SUDOERS_DIR, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def revoke_sudo(
         self, username: str, remove_ssh: bool = False, delete_user: bool = False
@@ -93,19 +143,20 @@ class SudoManager:
             remove_ssh: If True, also remove SSH access
             delete_user: If True, also delete the user account completely
         """
-        sudoers_file = self.SUDOERS_DIR / username
-
-        if not sudoers_file.exists():
-            logger.info(f"No sudo access configured for user {username}")
-            return
-
-        logger.info(f"Removing sudo access for user: {username}")
+        sudoers_file = os.path.join(self.SUDOERS_DIR, username)
 
+        # Just try the unlink: a separate exists() check costs a stat and
+        # leaves a window for the file to change in between
         try:
-            sudoers_file.unlink()
+            os.unlink(sudoers_file)
+            if self._sudoers_names is not None:
+                self._sudoers_names = self._sudoers_names - {username}
             logger.info(f"Sudo access removed for user {username}")
 
-        except (OSError, PermissionError) as e:
+        except FileNotFoundError:
+            logger.info(f"No sudo access configured for user {username}")
+            return
+        except OSError as e:
             raise RuntimeError(f"Failed to remove sudo access for {username}: {e}")
 
         # Handle additional removal operations
@@ -126,8 +177,30 @@ class SudoManager:
         Returns:
             True if user has sudo access, False otherwise
         """
-        sudoers_file = self.SUDOERS_DIR / username
-        return sudoers_file.exists()
+        if self._sudoers_names is not None:
+            return username in self._sudoers_names
+
+        # Plain string paths avoid building a Path just to stat it
+        return os.path.lexists(os.path.join(self.SUDOERS_DIR, username))
+
+    def list_sudo_users_set(self) -> FrozenSet[str]:
+        """Get the names of all sudoers files, scanning the directory once.
+
+        After this is called, has_sudo_access() answers from the snapshot
+        instead of stat-ing a file per user, which helps bulk operations.
+        Grants and revokes made through this instance keep it current.
+
+        Returns:
+            Set of usernames that have a sudoers file
+        """
+        if self._sudoers_names is None:
+            try:
+                with os.scandir(self.SUDOERS_DIR) as entries:
+                    self._sudoers_names = frozenset(entry.name for entry in entries)
+            except FileNotFoundError:
+                self._sudoers_names = frozenset()
+
+        return self._sudoers_names
 
     def list_sudo_users(self) -> List[str]:
         """List all users with sudo access managed by addy.
@@ -135,30 +208,60 @@ class SudoManager:
         Returns:
             List of usernames with sudo access
         """
-        if not self.SUDOERS_DIR.exists():
-            return []
-
         sudo_users = []
-        for sudoers_file in self.SUDOERS_DIR.iterdir():
-            if sudoers_file.is_file() and not sudoers_file.name.startswith("."):
-                # Basic check to see if this looks like an addy-managed file
-                if self._is_addy_sudoers_file(sudoers_file):
-                    sudo_users.append(sudoers_file.name)
+        try:
+            # scandir gives us d_type, so is_file() needs no extra stat
+            with os.scandir(self.SUDOERS_DIR) as entries:
+                for entry in entries:
+                    # Files no username could be named after (editor backups
+                    # and the like) can't be addy's, so aren't opened
+                    if not USERNAME_RE.fullmatch(entry.name):
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    # addy's file for a name has exactly one possible size,
+                    # so a stat rules out distro and config-management
+                    # files (90-cloud-init-users, README, ...) unopened
+                    size = len(self._addy_rule(entry.name))
+                    if entry.stat(follow_symlinks=False).st_size != size:
+                        continue
+                    # Basic check to see if this looks like an addy-managed file
+                    if self._is_addy_sudoers_file(entry):
+                        sudo_users.append(entry.name)
+        except FileNotFoundError:
+            return []
 
         return sorted(sudo_users)
 
-    def _validate_sudoers_file(self, file_path: Path) -> bool:
+    def _validate_sudoers_file(
+        self, file_path: Union[str, Path], content: Optional[bytes] = None
+    ) -> bool:
         """Validate a sudoers file using visudo.
 
         This is critical - invalid sudoers files can lock you out of sudo.
         Learned this the hard way during early testing!
 
+        Files holding nothing but addy's own one-line rule are accepted
+        without running visudo; anything else still goes through it.
+
         Args:
             file_path: Path to sudoers file to validate
+            content: File contents, if the caller has already read them
 
         Returns:
             True if valid, False otherwise
         """
+        if content is None:
+            content = self._read_rule(file_path)
+        # Only a complete read can show the file holds nothing else
+        if (
+            content is not None
+            and len(content) <= _MAX_ADDY_RULE_SIZE
+            and _ADDY_RULE_RE.fullmatch(content)
+        ):
+            logger.debug(f"Sudoers file matches addy rule format: {file_path}")
+            return True
+
         try:
             result = subprocess.run(
                 ["visudo", "-c", "-f", str(file_path)], capture_output=True, text=True
@@ -178,28 +281,67 @@ class SudoManager:
             logger.warning("visudo command not found, skipping validation")
             return True  # Assume valid if visudo not available
 
-    def _is_addy_sudoers_file(self, file_path: Path) -> bool:
-        """Check if a sudoers file was created by addy.
+    def _read_rule(self, file_path: "Union[str, os.PathLike[str]]") -> Optional[bytes]:
+        """Read the start of a sudoers file that may hold an addy rule.
 
         Args:
-            file_path: Path to sudoers file
+            file_path: Path (or scandir entry) of the sudoers file
 
         Returns:
-            True if this looks like an addy-managed file
+            Up to _MAX_ADDY_RULE_SIZE + 1 bytes of the file, so oversized
+            files can be told apart, or None if it can't be read
         """
         try:
-            with open(file_path, "r") as f:
-                content = f.read().strip()
+            try:
+                fd = os.open(file_path, os.O_RDONLY | _O_NOATIME)
+            except PermissionError:
+                if not _O_NOATIME:
+                    raise
+                # O_NOATIME is only allowed to the file's owner (or root)
+                fd = os.open(file_path, os.O_RDONLY)
+            try:
+                # Read one byte past the limit so oversized files are spotted
+                return os.read(fd, _MAX_ADDY_RULE_SIZE + 1)
+            finally:
+                os.close(fd)
+        except OSError:
+            return None
 
-            # Check if it matches our expected format
-            username = file_path.name
-            expected_rule = f"{username} ALL=(ALL) NOPASSWD:ALL"
+    def _is_addy_sudoers_file(self, file_path: "os.PathLike[str]") -> bool:
+        """Check if a sudoers file was created by addy.
 
-            return content == expected_rule
+        Args:
+            file_path: Path (or scandir entry) of the sudoers file
 
-        except (OSError, PermissionError):
+        Returns:
+            True if this looks like an addy-managed file
+        """
+        content = self._read_rule(file_path)
+        if content is None:
             return False
 
+        return self._is_addy_rule(os.path.basename(file_path), content)
+
+    def _addy_rule(self, username: str) -> bytes:
+        """Get the exact sudoers file contents addy writes for a user."""
+        return username.encode() + self._RULE_SUFFIX + b"\n"
+
+    def _is_addy_rule(self, username: str, content: bytes) -> bool:
+        """Check if sudoers content is exactly the rule addy writes for a user.
+
+        This decides what counts as addy-managed everywhere: listing, sudo
+        info and the integrity check. addy has always written the rule
+        byte for byte, so a file holding anything else has been edited.
+
+        Args:
+            username: Username the sudoers file is named after
+            content: Contents of the sudoers file
+
+        Returns:
+            True if the content matches addy's rule format
+        """
+        return content == self._addy_rule(username)
+
     def get_sudo_info(self, username: str) -> Optional[dict]:
         """Get sudo information for a user.
 
@@ -209,23 +351,23 @@ class SudoManager:
         Returns:
             Dictionary with sudo information or None
         """
-        sudoers_file = self.SUDOERS_DIR / username
+        sudoers_file = os.path.join(self.SUDOERS_DIR, username)
 
-        if not sudoers_file.exists():
+        if not os.path.exists(sudoers_file):
             return None
 
         try:
-            stat_info = sudoers_file.stat()
+            stat_info = os.stat(sudoers_file)
 
-            with open(sudoers_file, "r") as f:
-                content = f.read().strip()
+            with open(sudoers_file, "rb") as f:
+                content = f.read()
 
             return {
                 "username": username,
-                "sudoers_file": str(sudoers_file),
+                "sudoers_file": sudoers_file,
                 "permissions": oct(stat_info.st_mode)[-3:],
-                "content": content,
-                "is_addy_managed": self._is_addy_sudoers_file(sudoers_file),
+                "content": content.decode(errors="replace").strip(),
+                "is_addy_managed": self._is_addy_rule(username, content),
             }
 
         except (OSError, PermissionError) as e:
@@ -235,23 +377,56 @@ class SudoManager:
     def verify_sudoers_integrity(self) -> dict:
         """Verify integrity of all addy-managed sudoers files.
 
+        Files count as addy's the same way as in list_sudo_users(). Those
+        pass on the regex check where it applies and are checked by visudo
+        otherwise. Files that start with addy's rule but hold something
+        else too, and files that can't be read, are reported in errors.
+
         Returns:
             Dictionary with validation results
         """
         results = {"valid_files": [], "invalid_files": [], "errors": []}
 
         try:
-            if not self.SUDOERS_DIR.exists():
-                results["errors"].append("Sudoers directory does not exist")
-                return results
-
-            for sudoers_file in self.SUDOERS_DIR.iterdir():
-                if sudoers_file.is_file() and self._is_addy_sudoers_file(sudoers_file):
-                    if self._validate_sudoers_file(sudoers_file):
-                        results["valid_files"].append(sudoers_file.name)
-                    else:
-                        results["invalid_files"].append(sudoers_file.name)
+            with os.scandir(self.SUDOERS_DIR) as entries:
+                files = [
+                    entry
+                    for entry in entries
+                    if USERNAME_RE.fullmatch(entry.name)
+                    and entry.is_file(follow_symlinks=False)
+                ]
+
+            # Reads release the GIL, so fetch the files from a few threads to
+            # overlap I/O latency
+            contents: List[Optional[bytes]] = []
+            if files:
+                workers = min(MAX_IO_WORKERS, len(files))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    contents = list(executor.map(self._read_rule, files))
+
+            for entry, content in zip(files, contents):
+                if content is None:
+                    results["errors"].append(f"Cannot read sudoers file: {entry.name}")
+                    continue
+                if not self._is_addy_rule(entry.name, content):
+                    # Starts with addy's rule but was edited afterwards; the
+                    # prefix read is enough to tell, whatever the file's size
+                    if content.startswith(self._addy_rule(entry.name)):
+                        results["errors"].append(
+                            f"Sudoers file {entry.name} was modified after addy "
+                            "wrote it"
+                        )
+                    continue
+
+                # Reuse what was read for validation, so only files visudo
+                # actually has to check cost a fork+exec
+                if self._validate_sudoers_file(entry.path, content):
+                    results["valid_files"].append(entry.name)
+                else:
+                    results["invalid_files"].append(entry.name)
 
+        except FileNotFoundError:
+            results["errors"].append("Sudoers directory does not exist")
         except Exception as e:
             results["errors"].append(f"Failed to verify sudoers integrity: {e}")
 
@@ -3,23 +3,58 @@ User management operations for addy.
 """
 
 import os
+import re
 import pwd
 import grp
+import shutil
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 logger = logging.getLogger(__name__)
 
+# Usernames addy accepts anywhere: letters, digits, dots, dashes and
+# underscores; must start with a letter or digit and be at most 32 characters
+USERNAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,31}")
+
+# Upper bound on threads used for I/O-bound fan-out (checking many home
+# directories, reading many sudoers files)
+MAX_IO_WORKERS = 32
+
 
 class UserManager:
     """Manages Linux user accounts and SSH keys."""
 
+    PASSWD_FILE = "/etc/passwd"
+
     def __init__(self):
         """Initialize user manager."""
-        pass
+        # passwd entries looked up so far; getpwnam can mean NSS round-trips
+        self._pw_cache: Dict[str, pwd.struct_passwd] = {}
+
+    def _get_pw(self, username: str) -> pwd.struct_passwd:
+        """Look up a user's passwd entry, reusing earlier lookups.
+
+        Args:
+            username: Username to look up
+
+        Returns:
+            The user's passwd entry
+
+        Raises:
+            KeyError: If the user doesn't exist
+        """
+        try:
+            return self._pw_cache[username]
+        except KeyError:
+            pass
+
+        user_info = pwd.getpwnam(username)
+        self._pw_cache[username] = user_info
+        return user_info
 
     def user_exists(self, username: str) -> bool:
         """Check if a user exists.
@@ -31,7 +66,7 @@ class UserManager:
             True if user exists, False otherwise
         """
         try:
-            pwd.getpwnam(username)
+            self._get_pw(username)
             return True
         except KeyError:
             return False
@@ -46,6 +81,9 @@ class UserManager:
         Raises:
             RuntimeError: If user creation fails
         """
+        if not self.validate_username(username):
+            raise RuntimeError(f"Invalid username: {username}")
+
         if self.user_exists(username):
             logger.info(f"User {username} already exists")
             return
@@ -64,6 +102,7 @@ class UserManager:
 
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             logger.debug(f"useradd output: {result.stdout}")
+            self._pw_cache.pop(username, None)
 
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to create user {username}: {e.stderr}")
@@ -80,21 +119,154 @@ class UserManager:
                 subprocess.run(["userdel", "-r", username], capture_output=True)
             except:
                 pass
+            self._pw_cache.pop(username, None)
             raise RuntimeError(f"Failed to setup SSH directory for {username}: {e}")
 
-    def _setup_ssh_directory(self, username: str) -> None:
+    def create_users_bulk(self, usernames: List[str], shell: str = "/bin/bash") -> None:
+        """Create several user accounts with a single newusers run.
+
+        Each useradd is a fork+exec plus PAM/NSS setup, so batches go
+        through newusers instead. Accounts get a locked password, and a
+        home directory under useradd's default base, populated from its
+        skeleton directory, like useradd -m. If setting up any of them
+        fails, all accounts created by the batch are removed again. Falls
+        back to create_user() for each account when newusers isn't installed.
+
+        Args:
+            usernames: Usernames to create; existing users are skipped
+            shell: Default shell for the users
+
+        Raises:
+            RuntimeError: If user creation fails
+        """
+        # newusers reads colon-separated lines, so reject anything that
+        # could smuggle in extra fields or lines
+        for username in usernames:
+            if not self.validate_username(username):
+                raise RuntimeError(f"Invalid username: {username}")
+        if ":" in shell or "\n" in shell:
+            raise RuntimeError(f"Invalid shell: {shell}")
+
+        new_users = [u for u in dict.fromkeys(usernames) if not self.user_exists(u)]
+        if not new_users:
+            return
+
+        logger.info(f"Creating users: {', '.join(new_users)}")
+
+        try:
+            # newusers takes no defaults from useradd, so ask for them
+            defaults = self._useradd_defaults()
+            home_base = defaults.get("HOME", "/home")
+            skel = defaults.get("SKEL", "/etc/skel")
+
+            # name:password:uid:gid:gecos:home:shell, with the password
+            # already "encrypted" as "!" so the account is locked
+            batch = "".join(f"{u}:!::::{home_base}/{u}:{shell}\n" for u in new_users)
+
+            result = subprocess.run(
+                ["newusers", "--encrypted"],
+                input=batch,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            logger.debug(f"newusers output: {result.stdout}")
+        except FileNotFoundError:
+            logger.debug("newusers not available, creating users one at a time")
+            for username in new_users:
+                self.create_user(username, shell)
+            return
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to create users: {e.stderr}")
+
+        try:
+            for username in new_users:
+                self._pw_cache.pop(username, None)
+                try:
+                    user_info = self._get_pw(username)
+                except KeyError:
+                    raise RuntimeError(f"User {username} not found")
+                self._copy_skel(skel, user_info)
+                self._setup_ssh_directory(username, user_info)
+        except Exception as e:
+            # Like create_user, don't leave half set up accounts behind
+            for username in new_users:
+                try:
+                    subprocess.run(["userdel", "-r", username], capture_output=True)
+                except Exception:
+                    pass
+                self._pw_cache.pop(username, None)
+            raise RuntimeError(f"Failed to set up new users: {e}")
+
+        for username in new_users:
+            logger.info(f"User {username} created successfully")
+
+    def _useradd_defaults(self) -> Dict[str, str]:
+        """Get the defaults useradd applies to new accounts.
+
+        Returns:
+            useradd -D settings, such as HOME and SKEL
+        """
+        result = subprocess.run(
+            ["useradd", "-D"], capture_output=True, text=True, check=True
+        )
+        return dict(
+            line.split("=", 1) for line in result.stdout.splitlines() if "=" in line
+        )
+
+    def _copy_skel(self, skel: str, user_info: pwd.struct_passwd) -> None:
+        """Copy skeleton files into a new home directory, as useradd -m does.
+
+        Args:
+            skel: Skeleton directory to copy from
+            user_info: The new user's passwd entry
+
+        Raises:
+            RuntimeError: If the files can't be copied
+        """
+        if not os.path.isdir(skel):
+            return
+
+        home_dir = user_info.pw_dir
+        try:
+            # Copy entry by entry: copytree on skel itself would also give
+            # the home directory skel's (usually looser) permissions
+            with os.scandir(skel) as entries:
+                for entry in entries:
+                    target = os.path.join(home_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.copytree(
+                            entry.path, target, symlinks=True, dirs_exist_ok=True
+                        )
+                    else:
+                        shutil.copy2(entry.path, target, follow_symlinks=False)
+
+            for root, dirs, files in os.walk(home_dir):
+                for name in dirs + files:
+                    os.lchown(
+                        os.path.join(root, name), user_info.pw_uid, user_info.pw_gid
+                    )
+        except OSError as e:
+            raise RuntimeError(
+                f"Failed to copy skeleton files for {user_info.pw_name}: {e}"
+            )
+
+    def _setup_ssh_directory(
+        self, username: str, user_info: Optional[pwd.struct_passwd] = None
+    ) -> None:
         """Setup .ssh directory for a user.
 
         Args:
             username: Username to setup SSH directory for
+            user_info: The user's passwd entry, if the caller already has it
         """
         try:
-            user_info = pwd.getpwnam(username)
-            home_dir = Path(user_info.pw_dir)
-            ssh_dir = home_dir / ".ssh"
+            if user_info is None:
+                user_info = self._get_pw(username)
+            ssh_dir = user_info.pw_dir + "/.ssh"
 
             # Create .ssh directory
-            ssh_dir.mkdir(mode=0o700, exist_ok=True)
+            Path(ssh_dir).mkdir(mode=0o700, exist_ok=True)
 
             # Set ownership
             os.chown(ssh_dir, user_info.pw_uid, user_info.pw_gid)
@@ -123,21 +295,39 @@ class UserManager:
             raise RuntimeError(f"User {username} does not exist")
 
         try:
-            user_info = pwd.getpwnam(username)
-            home_dir = Path(user_info.pw_dir)
-            ssh_dir = home_dir / ".ssh"
-            authorized_keys = ssh_dir / "authorized_keys"
-
-            # Ensure SSH directory exists
-            self._setup_ssh_directory(username)
-
-            # Check if key already exists
-            if authorized_keys.exists():
-                with open(authorized_keys, "r") as f:
-                    existing_keys = f.read()
-                if public_key.strip() in existing_keys:
-                    logger.info(f"SSH key already installed for user {username}")
-                    return
+            user_info = self._get_pw(username)
+            # Plain strings: these paths are only handed to os-level calls
+            ssh_dir = user_info.pw_dir + "/.ssh"
+            authorized_keys = ssh_dir + "/authorized_keys"
+
+            # Ensure SSH directory exists. One stat tells us whether it is
+            # already in place and owned by the user, which is the usual
+            # case for repeat installs, so mkdir and chown can be skipped.
+            try:
+                st = os.stat(ssh_dir)
+                ssh_dir_ready = (st.st_uid, st.st_gid) == (
+                    user_info.pw_uid,
+                    user_info.pw_gid,
+                )
+            except FileNotFoundError:
+                ssh_dir_ready = False
+            if not ssh_dir_ready:
+                self._setup_ssh_directory(username, user_info)
+
+            # Check if key already exists. Compare key type and data only;
+            # the comment field doesn't change which key it is. Stream the
+            # file so a long authorized_keys is never read in one go.
+            key_fields = public_key.split()[:2]
+            try:
+                with open(authorized_keys, "r", buffering=8192) as f:
+                    for line in f:
+                        if line.split()[:2] == key_fields:
+                            logger.info(
+                                f"SSH key already installed for user {username}"
+                            )
+                            return
+            except FileNotFoundError:
+                pass
 
             # Add the public key
             logger.info(f"Installing SSH key for user: {username}")
@@ -166,19 +356,15 @@ class UserManager:
             return
 
         try:
-            user_info = pwd.getpwnam(username)
-            home_dir = Path(user_info.pw_dir)
-            authorized_keys = home_dir / ".ssh" / "authorized_keys"
+            user_info = self._get_pw(username)
+            authorized_keys = user_info.pw_dir + "/.ssh/authorized_keys"
 
-            if not authorized_keys.exists():
-                logger.info(f"No SSH keys found for user {username}")
-                return
-
-            logger.info(f"Removing SSH access for user: {username}")
-            authorized_keys.unlink()
+            os.unlink(authorized_keys)
 
             logger.info(f"SSH access removed for user {username}")
 
+        except FileNotFoundError:
+            logger.info(f"No SSH keys found for user {username}")
         except KeyError:
             logger.warning(f"User {username} not found")
         except (OSError, PermissionError) as e:
@@ -194,30 +380,32 @@ class UserManager:
             Dictionary with user information or None if user doesn't exist
         """
         try:
-            user_info = pwd.getpwnam(username)
-            home_dir = Path(user_info.pw_dir)
-            authorized_keys = home_dir / ".ssh" / "authorized_keys"
+            user_info = self._get_pw(username)
+            home_dir = user_info.pw_dir
+            authorized_keys = home_dir + "/.ssh/authorized_keys"
 
-            # Count SSH keys
+            # Count SSH keys on the raw bytes; splitlines() does the work in C
             key_count = 0
-            if authorized_keys.exists():
-                with open(authorized_keys, "r") as f:
-                    key_count = len(
-                        [
-                            line
-                            for line in f
-                            if line.strip() and not line.startswith("#")
-                        ]
-                    )
+            try:
+                with open(authorized_keys, "rb") as f:
+                    data = f.read()
+                has_ssh_access = True
+                key_count = sum(
+                    1
+                    for line in data.splitlines()
+                    if line.strip() and not line.startswith(b"#")
+                )
+            except FileNotFoundError:
+                has_ssh_access = False
 
             return {
                 "username": username,
                 "uid": user_info.pw_uid,
                 "gid": user_info.pw_gid,
-                "home_dir": str(home_dir),
+                "home_dir": home_dir,
                 "shell": user_info.pw_shell,
                 "ssh_key_count": key_count,
-                "has_ssh_access": authorized_keys.exists(),
+                "has_ssh_access": has_ssh_access,
             }
 
         except KeyError:
@@ -233,18 +421,36 @@ class UserManager:
             List of usernames with SSH access
         """
         users_with_ssh = []
+        candidates = []
 
         try:
-            # Get all users from /etc/passwd
-            for user_info in pwd.getpwall():
-                if user_info.pw_uid < 1000:  # Skip system users
-                    continue
-
-                home_dir = Path(user_info.pw_dir)
-                authorized_keys = home_dir / ".ssh" / "authorized_keys"
-
-                if authorized_keys.exists():
-                    users_with_ssh.append(user_info.pw_name)
+            # addy only creates local accounts, so read /etc/passwd directly
+            # rather than pwd.getpwall(), which also enumerates every NSS
+            # backend (LDAP, SSSD, ...)
+            with open(self.PASSWD_FILE, "r") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split(":")
+                    if len(fields) < 7:
+                        continue
+
+                    try:
+                        uid = int(fields[2])
+                    except ValueError:
+                        continue
+                    if uid < 1000:  # Skip system users
+                        continue
+
+                    candidates.append((fields[0], fields[5] + "/.ssh/authorized_keys"))
+
+            if candidates:
+                # stat() releases the GIL, so checking homes from a few threads
+                # overlaps the latency of an NFS-mounted /home
+                workers = min(MAX_IO_WORKERS, len(candidates))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    found = executor.map(os.path.exists, [p for _, p in candidates])
+                    users_with_ssh = [
+                        name for (name, _), hit in zip(candidates, found) if hit
+                    ]
 
         except Exception as e:
             logger.warning(f"Failed to list users with SSH access: {e}")
@@ -260,22 +466,7 @@ class UserManager:
         Returns:
             True if valid, False otherwise
         """
-        if not username:
-            return False
-
-        # Basic validation - alphanumeric, dots, dashes, underscores
-        if not username.replace("-", "").replace("_", "").replace(".", "").isalnum():
-            return False
-
-        # Must start with letter or number
-        if not username[0].isalnum():
-            return False
-
-        # Length check
-        if len(username) > 32:
-            return False
-
-        return True
+        return USERNAME_RE.fullmatch(username) is not None
 
     def delete_user(self, username: str) -> None:
         """Delete a user account completely.
@@ -297,6 +488,7 @@ class UserManager:
             cmd = ["userdel", "-r", username]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             logger.debug(f"userdel output: {result.stdout}")
+            self._pw_cache.pop(username, None)
             logger.info(f"User {username} deleted successfully")
 
         except subprocess.CalledProcessError as e:
@@ -3,10 +3,8 @@ Pytest configuration and fixtures for addy tests.
 """
 
 import os
-import tempfile
-import shutil
-from pathlib import Path
-from unittest.mock import Mock, patch
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, Mock, create_autospec, patch
 
 import pytest
 import git
@@ -17,12 +15,20 @@ from addy.user_manager import UserManager
 from addy.sudo_manager import SudoManager
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _default_root():
+    """Run every test as root; tests that need a regular user patch over it."""
+    with patch("os.geteuid", return_value=0):
+        yield
+
+
 @pytest.fixture
-def temp_dir():
-    """Create a temporary directory for testing."""
-    temp_path = tempfile.mkdtemp()
-    yield Path(temp_path)
-    shutil.rmtree(temp_path)
+def temp_dir(tmp_path):
+    """Create a temporary directory for testing.
+
+    Built on pytest's tmp_path, so it is unique per test and per xdist worker.
+    """
+    return tmp_path
 
 
 @pytest.fixture
@@ -39,6 +45,143 @@ def git_repo(config_manager, temp_dir):
     return GitRepository(config_manager, str(repo_dir))
 
 
+@pytest.fixture(scope="module")
+def _shared_user_manager():
+    return UserManager()
+
+
+@pytest.fixture
+def user_manager(_shared_user_manager):
+    """UserManager shared by a module's tests.
+
+    Its passwd cache is cleared for every test, since pwd is mocked
+    differently from one test to the next.
+    """
+    _shared_user_manager._pw_cache.clear()
+    return _shared_user_manager
+
+
+@pytest.fixture
+def sudo_manager():
+    """Create a SudoManager with no user manager."""
+    return SudoManager()
+
+
+@pytest.fixture
+def sudoers_dir(monkeypatch, temp_dir):
+    """Point SudoManager at an empty temporary sudoers directory."""
+    monkeypatch.setattr(SudoManager, "SUDOERS_DIR", temp_dir)
+    return temp_dir
+
+
+@pytest.fixture
+def missing_sudoers_dir(monkeypatch, temp_dir):
+    """Point SudoManager at a sudoers directory that doesn't exist."""
+    missing = temp_dir / "missing"
+    monkeypatch.setattr(SudoManager, "SUDOERS_DIR", missing)
+    return missing
+
+
+# Read-only variants, shared by a module's tests. Only use these in tests
+# that never set config values or write into the repository directory.
+
+
+@pytest.fixture(scope="module")
+def ro_config_manager(tmp_path_factory):
+    """Create a ConfigManager shared by the tests in a module."""
+    return ConfigManager(str(tmp_path_factory.mktemp("config")))
+
+
+@pytest.fixture(scope="module")
+def ro_git_repo(ro_config_manager, tmp_path_factory):
+    """Create a GitRepository shared by the tests in a module."""
+    return GitRepository(ro_config_manager, str(tmp_path_factory.mktemp("repo")))
+
+
+# create_autospec introspects the whole class, which costs milliseconds per
+# mock. Build each one once per session and reset it for every test instead.
+
+
+@pytest.fixture(scope="session")
+def _config_mock_proto():
+    return create_autospec(ConfigManager, instance=True)
+
+
+@pytest.fixture(scope="session")
+def _git_mock_proto():
+    return create_autospec(GitRepository, instance=True)
+
+
+@pytest.fixture(scope="session")
+def _user_mock_proto():
+    return create_autospec(UserManager, instance=True)
+
+
+@pytest.fixture(scope="session")
+def _sudo_mock_proto():
+    return create_autospec(SudoManager, instance=True)
+
+
+def _fresh(proto):
+    """Clear calls and any return values or side effects a test configured."""
+    proto.reset_mock(return_value=True, side_effect=True)
+    return proto
+
+
+@pytest.fixture
+def mock_config(_config_mock_proto):
+    """Autospecced ConfigManager instance mock."""
+    return _fresh(_config_mock_proto)
+
+
+@pytest.fixture
+def mock_git(_git_mock_proto):
+    """Autospecced GitRepository instance mock."""
+    return _fresh(_git_mock_proto)
+
+
+@pytest.fixture
+def mock_user(_user_mock_proto):
+    """Autospecced UserManager instance mock."""
+    return _fresh(_user_mock_proto)
+
+
+@pytest.fixture
+def mock_sudo(_sudo_mock_proto):
+    """Autospecced SudoManager instance mock."""
+    return _fresh(_sudo_mock_proto)
+
+
+# Manager classes patched by patched_cli, and their instance mock fixtures
+_CLI_INSTANCE_MOCKS = {
+    "ConfigManager": "mock_config",
+    "GitRepository": "mock_git",
+    "UserManager": "mock_user",
+    "SudoManager": "mock_sudo",
+}
+
+
+@pytest.fixture
+def patched_cli(request):
+    """Patch the manager classes in addy.cli with one patch.multiple.
+
+    Classes whose mock_* instance fixture the test asks for hand out that
+    instance; the rest return plain MagicMocks. Returns the dict of class
+    mocks, keyed by class name.
+    """
+    patcher = patch.multiple(
+        "addy.cli", **{name: DEFAULT for name in _CLI_INSTANCE_MOCKS}
+    )
+    classes = patcher.start()
+    request.addfinalizer(patcher.stop)
+
+    # Only set up the instance mocks the test declared
+    for name, fixture in _CLI_INSTANCE_MOCKS.items():
+        if fixture in request.fixturenames:
+            classes[name].return_value = request.getfixturevalue(fixture)
+    return classes
+
+
 @pytest.fixture
 def mock_user_manager():
     """Create a mock UserManager for testing."""
@@ -52,11 +195,54 @@ def mock_sudo_manager():
 
 
 @pytest.fixture
+def patched_managers(monkeypatch, mock_user_manager, mock_sudo_manager):
+    """Make addy.cli build mock_user_manager and mock_sudo_manager.
+
+    A lighter alternative to patched_cli for commands that only use these
+    two managers. Returns the (user manager, sudo manager) pair.
+    """
+    monkeypatch.setattr("addy.cli.UserManager", lambda: mock_user_manager)
+    monkeypatch.setattr("addy.cli.SudoManager", lambda user_manager: mock_sudo_manager)
+    return mock_user_manager, mock_sudo_manager
+
+
+@pytest.fixture(scope="session")
 def sample_ssh_key():
     """Sample SSH public key for testing."""
     return "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABgQC7vbqajDhZh7Z8QJ5L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L8F5K6H6L test@example.com"
 
 
+@pytest.fixture(scope="session")
+def sample_ssh_key_file(tmp_path_factory, sample_ssh_key):
+    """A file holding sample_ssh_key, for tests to hard-link into place.
+
+    Links share the file's contents, so never write through them.
+    """
+    key_file = tmp_path_factory.mktemp("keys") / "canonical.pub"
+    key_file.write_text(sample_ssh_key)
+    return key_file
+
+
+@pytest.fixture
+def make_pw():
+    """Factory for stand-ins for pwd.struct_passwd entries.
+
+    Plain SimpleNamespaces: tests only read their attributes, and attribute
+    access on a Mock creates child mocks on the fly.
+    """
+
+    def _make(name="testuser", uid=1000, gid=1000, home=None, shell="/bin/bash"):
+        return SimpleNamespace(
+            pw_name=name,
+            pw_uid=uid,
+            pw_gid=gid,
+            pw_dir=home or f"/home/{name}",
+            pw_shell=shell,
+        )
+
+    return _make
+
+
 @pytest.fixture
 def mock_git_repo(temp_dir):
     """Create a mock Git repository for testing."""
@@ -82,6 +268,18 @@ def mock_git_repo(temp_dir):
     return repo_dir
 
 
+@pytest.fixture
+def no_git(monkeypatch):
+    """Replace git.Repo so no test runs git or reaches a remote.
+
+    Returns the mock standing in for the git.Repo class; clone_from is one
+    of its attributes.
+    """
+    repo_class = Mock()
+    monkeypatch.setattr(git, "Repo", repo_class)
+    return repo_class
+
+
 @pytest.fixture
 def mock_subprocess():
     """Mock subprocess for testing system commands."""
@@ -93,22 +291,14 @@ def mock_subprocess():
 
 
 @pytest.fixture
-def mock_pwd():
+def mock_pwd(make_pw):
     """Mock pwd module for testing user operations."""
-    with patch("pwd.getpwnam") as mock_getpwnam, patch("pwd.getpwall") as mock_getpwall:
+    with patch("pwd.getpwnam") as mock_getpwnam:
 
         # Mock user info
-        mock_user = Mock()
-        mock_user.pw_name = "testuser"
-        mock_user.pw_uid = 1000
-        mock_user.pw_gid = 1000
-        mock_user.pw_dir = "/home/testuser"
-        mock_user.pw_shell = "/bin/bash"
-
-        mock_getpwnam.return_value = mock_user
-        mock_getpwall.return_value = [mock_user]
+        mock_getpwnam.return_value = make_pw()
 
-        yield mock_getpwnam, mock_getpwall
+        yield mock_getpwnam
 
 
 @pytest.fixture
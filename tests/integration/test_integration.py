@@ -3,12 +3,14 @@
 Simple integration test to verify sudo user creation functionality.
 """
 
-from unittest.mock import Mock, patch
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
 from addy.sudo_manager import SudoManager
 from addy.user_manager import UserManager
 
 
-def test_sudo_with_user_creation():
+def test_sudo_with_user_creation(tmp_path):
     """Test that we can install sudo for a non-existent user."""
 
     # Create real instances
@@ -18,14 +20,8 @@ def test_sudo_with_user_creation():
     # Mock the user_manager methods
     with patch.object(user_manager, "user_exists", return_value=False), patch.object(
         user_manager, "create_user"
-    ) as mock_create, patch("subprocess.run") as mock_subprocess, patch(
-        "pathlib.Path.exists", return_value=False
-    ), patch(
-        "pathlib.Path.rename"
-    ), patch(
-        "builtins.open"
-    ), patch(
-        "os.chmod"
+    ) as mock_create, patch("subprocess.run") as mock_subprocess, patch.object(
+        SudoManager, "SUDOERS_DIR", tmp_path
     ):
 
         # Mock visudo validation to pass
@@ -36,6 +32,7 @@ def test_sudo_with_user_creation():
 
         # Verify user creation was called
         mock_create.assert_called_once_with("newuser")
+        assert (tmp_path / "newuser").exists()
 
         print("✓ Test passed: sudo installation with user creation works")
 
@@ -66,6 +63,6 @@ def test_sudo_without_user_creation():
 
 
 if __name__ == "__main__":
-    test_sudo_with_user_creation()
+    test_sudo_with_user_creation(Path(tempfile.mkdtemp()))
     test_sudo_without_user_creation()
     print("✓ All integration tests passed!")
@@ -3,7 +3,7 @@
 Integration test to demonstrate the new sudo removal options.
 """
 
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 from addy.sudo_manager import SudoManager
 from addy.user_manager import UserManager
 
@@ -13,13 +13,9 @@ def test_remove_sudo_only():
     user_manager = UserManager()
     sudo_manager = SudoManager(user_manager)
 
-    with patch("pathlib.Path.exists", return_value=True), patch(
-        "pathlib.Path.unlink"
-    ) as mock_unlink, patch.object(
+    with patch("os.unlink") as mock_unlink, patch.object(
         user_manager, "remove_ssh_access"
-    ) as mock_remove_ssh, patch.object(
-        user_manager, "delete_user"
-    ) as mock_delete:
+    ) as mock_remove_ssh, patch.object(user_manager, "delete_user") as mock_delete:
 
         # Remove sudo only (default behavior)
         sudo_manager.revoke_sudo("alice")
@@ -37,13 +33,9 @@ def test_remove_sudo_and_ssh():
     user_manager = UserManager()
     sudo_manager = SudoManager(user_manager)
 
-    with patch("pathlib.Path.exists", return_value=True), patch(
-        "pathlib.Path.unlink"
-    ) as mock_unlink, patch.object(
+    with patch("os.unlink") as mock_unlink, patch.object(
         user_manager, "remove_ssh_access"
-    ) as mock_remove_ssh, patch.object(
-        user_manager, "delete_user"
-    ) as mock_delete:
+    ) as mock_remove_ssh, patch.object(user_manager, "delete_user") as mock_delete:
 
         # Remove sudo + SSH
         sudo_manager.revoke_sudo("alice", remove_ssh=True)
@@ -61,13 +53,9 @@ def test_remove_sudo_and_delete_user():
     user_manager = UserManager()
     sudo_manager = SudoManager(user_manager)
 
-    with patch("pathlib.Path.exists", return_value=True), patch(
-        "pathlib.Path.unlink"
-    ) as mock_unlink, patch.object(
+    with patch("os.unlink") as mock_unlink, patch.object(
         user_manager, "remove_ssh_access"
-    ) as mock_remove_ssh, patch.object(
-        user_manager, "delete_user"
-    ) as mock_delete:
+    ) as mock_remove_ssh, patch.object(user_manager, "delete_user") as mock_delete:
 
         # Remove sudo + SSH + delete user
         sudo_manager.revoke_sudo("alice", delete_user=True)
@@ -2,384 +2,318 @@
 Tests for CLI interface.
 """
 
+import os
+
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch
 from click.testing import CliRunner
 
 from addy.cli import cli, _parse_package, check_root
 
 
-class TestCLI:
-    """Test CLI functionality."""
-
-    def setUp(self):
-        """Set up test fixtures."""
-        self.runner = CliRunner()
-
-    def test_version_command(self):
-        """Test version command."""
-        runner = CliRunner()
-        result = runner.invoke(cli, ["version"])
-
-        assert result.exit_code == 0
-        assert "addy 1.0.3" in result.output
-
-    def test_help_command(self):
-        """Test help command."""
-        runner = CliRunner()
-        result = runner.invoke(cli, ["--help"])
-
-        assert result.exit_code == 0
-        assert "Git-Driven SSH Access Control" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.ConfigManager")
-    def test_config_set_command(self, mock_config_class, mock_geteuid):
-        """Test config set command."""
-        mock_geteuid.return_value = 0  # Root user
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        runner = CliRunner()
-        result = runner.invoke(
-            cli, ["config", "set", "git-repo", "git@github.com:test/repo.git"]
-        )
-
-        assert result.exit_code == 0
-        mock_config.set.assert_called_once_with(
-            "git-repo", "git@github.com:test/repo.git"
-        )
-        assert "Set git-repo=git@github.com:test/repo.git" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.ConfigManager")
-    def test_config_get_command(self, mock_config_class, mock_geteuid):
-        """Test config get command."""
-        mock_geteuid.return_value = 0  # Root user
-        mock_config = Mock()
-        mock_config.get.return_value = "git@github.com:test/repo.git"
-        mock_config_class.return_value = mock_config
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["config", "get", "git-repo"])
-
-        assert result.exit_code == 0
-        mock_config.get.assert_called_once_with("git-repo")
-        assert "git@github.com:test/repo.git" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.ConfigManager")
-    def test_config_get_not_found(self, mock_config_class, mock_geteuid):
-        """Test config get command for non-existent key."""
-        mock_geteuid.return_value = 0  # Root user
-        mock_config = Mock()
-        mock_config.get.return_value = None
-        mock_config_class.return_value = mock_config
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["config", "get", "nonexistent"])
-
-        assert result.exit_code == 1
-        assert "not found" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.ConfigManager")
-    def test_config_list_command(self, mock_config_class, mock_geteuid):
-        """Test config list command."""
-        mock_geteuid.return_value = 0  # Root user
-        mock_config = Mock()
-        mock_config.list_all.return_value = {
-            "git-repo": "git@github.com:test/repo.git",
-            "git-branch": "main",
-        }
-        mock_config_class.return_value = mock_config
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["config", "list"])
-
-        assert result.exit_code == 0
-        assert "git-repo=git@github.com:test/repo.git" in result.output
-        assert "git-branch=main" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.UserManager")
-    @patch("addy.cli.GitRepository")
-    @patch("addy.cli.ConfigManager")
-    def test_install_user_package(
-        self, mock_config_class, mock_git_class, mock_user_class, mock_geteuid
-    ):
-        """Test installing user package."""
-        mock_geteuid.return_value = 0  # Root user
-
-        # Mock dependencies
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        mock_git = Mock()
-        mock_git.get_public_key.return_value = "ssh-rsa AAAAB3... test@example.com"
-        mock_git_class.return_value = mock_git
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["install", "user/alice"])
-
-        assert result.exit_code == 0
-        mock_git.sync.assert_called_once()
-        mock_git.get_public_key.assert_called_once_with("alice")
-        mock_user.create_user.assert_called_once_with("alice")
-        mock_user.install_ssh_key.assert_called_once()
-        assert "installed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.SudoManager")
-    @patch("addy.cli.UserManager")
-    @patch("addy.cli.GitRepository")
-    @patch("addy.cli.ConfigManager")
-    def test_install_sudo_package(
-        self,
-        mock_config_class,
-        mock_git_class,
-        mock_user_class,
-        mock_sudo_class,
-        mock_geteuid,
-    ):
-        """Test installing sudo package."""
-        mock_geteuid.return_value = 0  # Root user
-
-        # Mock dependencies
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        mock_git = Mock()
-        mock_git_class.return_value = mock_git
-
-        mock_user = Mock()
-        mock_user.user_exists.return_value = True
-        mock_user_class.return_value = mock_user
-
-        mock_sudo = Mock()
-        mock_sudo_class.return_value = mock_sudo
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["install", "sudo/alice"])
-
-        assert result.exit_code == 0
-        mock_git.sync.assert_called_once()
-        mock_sudo.grant_sudo.assert_called_once_with("alice", create_user=True)
-        assert "installed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.SudoManager")
-    @patch("addy.cli.UserManager")
-    @patch("addy.cli.GitRepository")
-    @patch("addy.cli.ConfigManager")
-    def test_install_sudo_creates_user_if_not_exists(
-        self,
-        mock_config_class,
-        mock_git_class,
-        mock_user_class,
-        mock_sudo_class,
-        mock_geteuid,
-    ):
-        """Test installing sudo package creates user if they don't exist."""
-        mock_geteuid.return_value = 0  # Root user
-
-        # Mock dependencies
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        mock_git = Mock()
-        mock_git_class.return_value = mock_git
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        mock_sudo = Mock()
-        mock_sudo_class.return_value = mock_sudo
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["install", "sudo/alice"])
-
-        assert result.exit_code == 0
-        mock_git.sync.assert_called_once()
-        mock_sudo.grant_sudo.assert_called_once_with("alice", create_user=True)
-        assert "installed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.UserManager")
-    def test_remove_user_package(self, mock_user_class, mock_geteuid):
-        """Test removing user package."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "user/alice"])
-
-        assert result.exit_code == 0
-        mock_user.remove_ssh_access.assert_called_once_with("alice")
-        assert "removed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.SudoManager")
-    @patch("addy.cli.UserManager")
-    def test_remove_sudo_package(self, mock_user_class, mock_sudo_class, mock_geteuid):
-        """Test removing sudo package."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        mock_sudo = Mock()
-        mock_sudo_class.return_value = mock_sudo
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "sudo/alice"])
-
-        assert result.exit_code == 0
-        mock_sudo.revoke_sudo.assert_called_once_with(
-            "alice", remove_ssh=False, delete_user=False
-        )
-        assert "removed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.GitRepository")
-    @patch("addy.cli.ConfigManager")
-    def test_sync_command(self, mock_config_class, mock_git_class, mock_geteuid):
-        """Test sync command."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_config = Mock()
-        mock_config_class.return_value = mock_config
-
-        mock_git = Mock()
-        mock_git_class.return_value = mock_git
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["sync"])
-
-        assert result.exit_code == 0
-        mock_git.sync.assert_called_once()
-        assert "synced successfully" in result.output
-
-    def test_non_root_user(self):
-        """Test that non-root users are rejected for privileged commands."""
-        with patch("os.geteuid", return_value=1000):  # Non-root user
-            runner = CliRunner()
-            result = runner.invoke(cli, ["config", "set", "key", "value"])
-
-            assert result.exit_code == 1
-            assert "must be run as root" in result.output
-
-    def test_parse_package_valid(self):
-        """Test parsing valid package strings."""
-        assert _parse_package("user/alice") == ("user", "alice")
-        assert _parse_package("sudo/bob") == ("sudo", "bob")
-        assert _parse_package("user/test-user") == ("user", "test-user")
-        assert _parse_package("user/test_user") == ("user", "test_user")
-        assert _parse_package("user/test.user") == ("user", "test.user")
-
-    def test_parse_package_invalid(self):
-        """Test parsing invalid package strings."""
-        with pytest.raises(ValueError, match="Invalid package format"):
-            _parse_package("invalid")
-
-        with pytest.raises(ValueError, match="Invalid username"):
-            _parse_package("user/alice/extra")
-
-        with pytest.raises(ValueError, match="Package type must be"):
-            _parse_package("invalid/alice")
-
-        with pytest.raises(ValueError, match="Invalid username"):
-            _parse_package("user/")
-
-        with pytest.raises(ValueError, match="Invalid username"):
-            _parse_package("user/alice@invalid")
-
-    def test_check_root_function(self):
-        """Test check_root function directly."""
-        with patch("os.geteuid", return_value=0):
-            check_root()  # Should not raise
-
-        with patch("os.geteuid", return_value=1000):
-            with pytest.raises(SystemExit):
-                check_root()
-
-    @patch("os.geteuid")
-    @patch("addy.cli.SudoManager")
-    @patch("addy.cli.UserManager")
-    def test_remove_sudo_with_remove_user_flag(
-        self, mock_user_class, mock_sudo_class, mock_geteuid
-    ):
-        """Test removing sudo package with --remove-user flag."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        mock_sudo = Mock()
-        mock_sudo_class.return_value = mock_sudo
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "sudo/alice", "--remove-user"])
-
-        assert result.exit_code == 0
-        mock_sudo.revoke_sudo.assert_called_once_with(
-            "alice", remove_ssh=True, delete_user=False
-        )
-        assert "removed successfully" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.SudoManager")
-    @patch("addy.cli.UserManager")
-    def test_remove_sudo_with_delete_account_flag(
-        self, mock_user_class, mock_sudo_class, mock_geteuid
-    ):
-        """Test removing sudo package with --delete-account flag."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        mock_sudo = Mock()
-        mock_sudo_class.return_value = mock_sudo
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "sudo/alice", "--delete-account"])
-
-        assert result.exit_code == 0
-        mock_sudo.revoke_sudo.assert_called_once_with(
-            "alice", remove_ssh=True, delete_user=True
-        )
-        assert "removed successfully" in result.output
-
-    @patch("os.geteuid")
-    def test_remove_user_with_remove_user_flag_error(self, mock_geteuid):
-        """Test that --remove-user flag is rejected for user packages."""
-        mock_geteuid.return_value = 0  # Root user
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "user/alice", "--remove-user"])
-
-        assert result.exit_code == 1
-        assert "can only be used with sudo packages" in result.output
-
-    @patch("os.geteuid")
-    @patch("addy.cli.UserManager")
-    def test_remove_user_with_delete_account_flag(self, mock_user_class, mock_geteuid):
-        """Test removing user package with --delete-account flag."""
-        mock_geteuid.return_value = 0  # Root user
-
-        mock_user = Mock()
-        mock_user_class.return_value = mock_user
-
-        runner = CliRunner()
-        result = runner.invoke(cli, ["remove", "user/alice", "--delete-account"])
-
-        assert result.exit_code == 0
-        mock_user.remove_ssh_access.assert_called_once_with("alice")
-        mock_user.delete_user.assert_called_once_with("alice")
-        assert "removed successfully" in result.output
+@pytest.fixture(scope="module")
+def runner():
+    """CLI runner shared by the tests; it keeps no state between invokes."""
+    return CliRunner()
+
+
+@pytest.fixture(scope="module")
+def invoke(runner):
+    """Run addy with the given arguments.
+
+    Unexpected exceptions propagate instead of being turned into a result,
+    so a failing test shows the real traceback.
+    """
+
+    def _invoke(args):
+        return runner.invoke(cli, args, catch_exceptions=False)
+
+    return _invoke
+
+
+def test_version_command(invoke):
+    """Test version command."""
+    result = invoke(["version"])
+
+    assert result.exit_code == 0
+    assert "addy 1.0.3" in result.output
+
+
+def test_help_command(invoke):
+    """Test help command."""
+    result = invoke(["--help"])
+
+    assert result.exit_code == 0
+    assert "Git-Driven SSH Access Control" in result.output
+
+
+def test_config_set_command(invoke, patched_cli, mock_config):
+    """Test config set command."""
+    result = invoke(["config", "set", "git-repo", "git@github.com:test/repo.git"])
+
+    assert result.exit_code == 0
+    mock_config.set.assert_called_once_with("git-repo", "git@github.com:test/repo.git")
+    assert "Set git-repo=git@github.com:test/repo.git" in result.output
+
+
+@pytest.mark.parametrize(
+    "value,exit_code,expected_output",
+    [
+        ("git@github.com:test/repo.git", 0, "git@github.com:test/repo.git"),
+        (None, 1, "not found"),
+    ],
+    ids=["found", "not-found"],
+)
+def test_config_get_command(
+    invoke, patched_cli, mock_config, value, exit_code, expected_output
+):
+    """Test config get command, for a set and an unset key."""
+    mock_config.get.return_value = value
+
+    result = invoke(["config", "get", "git-repo"])
+
+    assert result.exit_code == exit_code
+    mock_config.get.assert_called_once_with("git-repo")
+    assert expected_output in result.output
+
+
+def test_config_list_command(invoke, patched_cli, mock_config):
+    """Test config list command."""
+    mock_config.list_all.return_value = {
+        "git-repo": "git@github.com:test/repo.git",
+        "git-branch": "main",
+    }
+
+    result = invoke(["config", "list"])
+
+    assert result.exit_code == 0
+    assert "git-repo=git@github.com:test/repo.git" in result.output
+    assert "git-branch=main" in result.output
+
+
+def test_install_user_package(invoke, patched_cli, mock_git, mock_user):
+    """Test installing user package."""
+    mock_git.get_public_key.return_value = "ssh-rsa AAAAB3... test@example.com"
+
+    result = invoke(["install", "user/alice"])
+
+    assert result.exit_code == 0
+    mock_git.sync.assert_called_once()
+    mock_git.get_public_key.assert_called_once_with("alice")
+    mock_user.create_user.assert_called_once_with("alice")
+    mock_user.install_ssh_key.assert_called_once_with(
+        "alice", "ssh-rsa AAAAB3... test@example.com"
+    )
+    assert "installed successfully" in result.output
+
+
+def test_install_sudo_package(invoke, patched_cli, mock_git, mock_sudo):
+    """Test installing sudo package, creating the user if they don't exist."""
+    result = invoke(["install", "sudo/alice"])
+
+    assert result.exit_code == 0
+    mock_git.sync.assert_called_once()
+    mock_sudo.grant_sudo.assert_called_once_with("alice", create_user=True)
+    assert "installed successfully" in result.output
+
+
+def test_remove_user_package(invoke, patched_managers):
+    """Test removing user package."""
+    user_manager, _ = patched_managers
+    result = invoke(["remove", "user/alice"])
+
+    assert result.exit_code == 0
+    user_manager.remove_ssh_access.assert_called_once_with("alice")
+    assert "removed successfully" in result.output
+
+
+def test_remove_sudo_package(invoke, patched_managers):
+    """Test removing sudo package."""
+    _, sudo_manager = patched_managers
+    result = invoke(["remove", "sudo/alice"])
+
+    assert result.exit_code == 0
+    sudo_manager.revoke_sudo.assert_called_once_with(
+        "alice", remove_ssh=False, delete_user=False
+    )
+    assert "removed successfully" in result.output
+
+
+def test_sync_command(invoke, patched_cli, mock_git):
+    """Test sync command."""
+    result = invoke(["sync"])
+
+    assert result.exit_code == 0
+    mock_git.sync.assert_called_once()
+    assert "synced successfully" in result.output
+
+
+def test_non_root_user(invoke, monkeypatch):
+    """Test that non-root users are rejected for privileged commands."""
+    monkeypatch.setattr(os, "geteuid", lambda: 1000)  # Non-root user
+
+    result = invoke(["config", "set", "key", "value"])
+
+    assert result.exit_code == 1
+    assert "must be run as root" in result.output
+
+
+@pytest.mark.parametrize(
+    "package,expected",
+    [
+        ("user/alice", ("user", "alice")),
+        ("sudo/bob", ("sudo", "bob")),
+        ("user/test-user", ("user", "test-user")),
+        ("user/test_user", ("user", "test_user")),
+        ("user/test.user", ("user", "test.user")),
+    ],
+)
+def test_parse_package_valid(package, expected):
+    """Test parsing valid package strings."""
+    assert _parse_package(package) == expected
+
+
+@pytest.mark.parametrize(
+    "package,message",
+    [
+        ("invalid", "Invalid package format"),
+        ("user/alice/extra", "Invalid username"),
+        ("invalid/alice", "Package type must be"),
+        ("user/", "Invalid username"),
+        ("user/alice@invalid", "Invalid username"),
+        ("sudo/..", "Invalid username"),
+        ("user/.", "Invalid username"),
+        ("user/-", "Invalid username"),
+        ("sudo/_", "Invalid username"),
+        ("user/alice\n", "Invalid username"),
+    ],
+)
+def test_parse_package_invalid(package, message):
+    """Test parsing invalid package strings."""
+    with pytest.raises(ValueError, match=message):
+        _parse_package(package)
+
+
+@pytest.mark.parametrize("euid,exits", [(0, False), (1000, True)])
+def test_check_root_function(monkeypatch, euid, exits):
+    """Test check_root function directly."""
+    monkeypatch.setattr(os, "geteuid", lambda: euid)
+
+    if exits:
+        with pytest.raises(SystemExit):
+            check_root()
+    else:
+        check_root()  # Should not raise
+
+
+def test_remove_sudo_with_remove_user_flag(invoke, patched_managers):
+    """Test removing sudo package with --remove-user flag."""
+    _, sudo_manager = patched_managers
+    result = invoke(["remove", "sudo/alice", "--remove-user"])
+
+    assert result.exit_code == 0
+    sudo_manager.revoke_sudo.assert_called_once_with(
+        "alice", remove_ssh=True, delete_user=False
+    )
+    assert "removed successfully" in result.output
+
+
+def test_remove_sudo_with_delete_account_flag(invoke, patched_managers):
+    """Test removing sudo package with --delete-account flag."""
+    _, sudo_manager = patched_managers
+    result = invoke(["remove", "sudo/alice", "--delete-account"])
+
+    assert result.exit_code == 0
+    sudo_manager.revoke_sudo.assert_called_once_with(
+        "alice", remove_ssh=True, delete_user=True
+    )
+    assert "removed successfully" in result.output
+
+
+def test_remove_user_with_remove_user_flag_error(invoke):
+    """Test that --remove-user flag is rejected for user packages."""
+    result = invoke(["remove", "user/alice", "--remove-user"])
+
+    assert result.exit_code == 1
+    assert "can only be used with sudo packages" in result.output
+
+
+def test_remove_user_with_delete_account_flag(invoke, patched_managers):
+    """Test removing user package with --delete-account flag."""
+    user_manager, _ = patched_managers
+    result = invoke(["remove", "user/alice", "--delete-account"])
+
+    assert result.exit_code == 0
+    user_manager.remove_ssh_access.assert_called_once_with("alice")
+    user_manager.delete_user.assert_called_once_with("alice")
+    assert "removed successfully" in result.output
+
+
+def test_install_builds_each_manager_once(invoke, patched_cli, mock_config, mock_user):
+    """Test that install shares one instance of each manager."""
+    result = invoke(["install", "sudo/alice"])
+
+    assert result.exit_code == 0
+    patched_cli["ConfigManager"].assert_called_once_with()
+    patched_cli["GitRepository"].assert_called_once_with(mock_config)
+    patched_cli["UserManager"].assert_called_once_with()
+    patched_cli["SudoManager"].assert_called_once_with(mock_user)
+
+
+@patch("addy.cli.setup_logging")
+def test_version_skips_logging_setup(mock_setup_logging, invoke):
+    """Test that commands which never log don't configure logging."""
+    result = invoke(["version"])
+
+    assert result.exit_code == 0
+    mock_setup_logging.assert_not_called()
+
+
+@patch("addy.cli.setup_logging")
+def test_sync_sets_up_logging(mock_setup_logging, invoke, patched_cli):
+    """Test that logging is configured once a command builds a manager."""
+    result = invoke(["sync"])
+
+    assert result.exit_code == 0
+    mock_setup_logging.assert_called_once_with(False)
+
+
+def test_install_multiple_packages(invoke, patched_cli, mock_git, mock_user, mock_sudo):
+    """Test installing several packages syncs the repository once."""
+    result = invoke(["install", "user/alice", "user/bob", "sudo/bob"])
+
+    assert result.exit_code == 0
+    mock_git.sync.assert_called_once()
+    mock_user.create_users_bulk.assert_called_once_with(["alice", "bob"])
+    assert [c.args for c in mock_user.create_user.call_args_list] == [
+        ("alice",),
+        ("bob",),
+    ]
+    mock_sudo.grant_sudo.assert_called_once_with("bob", create_user=True)
+    assert result.output.count("installed successfully") == 3
+
+
+def test_install_invalid_package_in_batch(invoke, patched_cli, mock_git):
+    """Test that one invalid package aborts the batch before syncing."""
+    result = invoke(["install", "user/alice", "bogus"])
+
+    assert result.exit_code == 1
+    assert "Invalid package format" in result.output
+    mock_git.sync.assert_not_called()
+
+
+def test_install_batch_missing_key_creates_no_users(
+    invoke, patched_cli, mock_git, mock_user
+):
+    """Test a missing key aborts the batch before any account is created."""
+    mock_git.get_public_key.side_effect = [
+        "ssh-rsa AAAAB3... alice@example.com",
+        RuntimeError("Public key not found: users/bob.pub"),
+    ]
+
+    result = invoke(["install", "user/alice", "user/bob"])
+
+    assert result.exit_code == 1
+    assert "Public key not found" in result.output
+    mock_user.create_users_bulk.assert_not_called()
+    mock_user.create_user.assert_not_called()
@@ -2,8 +2,10 @@
 Tests for Git operations.
 """
 
+import os
+
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch
 from pathlib import Path
 
 import git
@@ -12,183 +14,284 @@ from addy.git_ops import GitRepository
 from addy.config import ConfigManager
 
 
-class TestGitRepository:
-    """Test GitRepository functionality."""
+def test_init_creates_repo_dir(config_manager, temp_dir):
+    """Test that GitRepository creates repo directory."""
+    repo_dir = temp_dir / "test_repo"
+    git_repo = GitRepository(config_manager, str(repo_dir))
 
-    def test_init_creates_repo_dir(self, config_manager, temp_dir):
-        """Test that GitRepository creates repo directory."""
-        repo_dir = temp_dir / "test_repo"
-        git_repo = GitRepository(config_manager, str(repo_dir))
+    assert repo_dir.exists()
+    assert repo_dir.stat().st_mode & 0o777 == 0o700
 
-        assert repo_dir.exists()
-        assert repo_dir.stat().st_mode & 0o777 == 0o700
 
-    @patch("git.Repo.clone_from")
-    def test_sync_clone_new_repo(self, mock_clone, config_manager, git_repo):
-        """Test syncing by cloning new repository."""
-        config_manager.set("git-repo", "git@github.com:test/repo.git")
-        config_manager.set("git-branch", "main")
+def test_sync_clone_new_repo(no_git, config_manager, git_repo):
+    """Test syncing by cloning new repository."""
+    config_manager.set("git-repo", "git@github.com:test/repo.git")
+    config_manager.set("git-branch", "main")
 
-        mock_repo = Mock()
-        mock_clone.return_value = mock_repo
+    mock_repo = Mock()
+    no_git.clone_from.return_value = mock_repo
 
-        git_repo.sync()
+    git_repo.sync()
+
+    no_git.clone_from.assert_called_once()
+    args, kwargs = no_git.clone_from.call_args
+    assert args[0] == "git@github.com:test/repo.git"
+    assert args[1] == git_repo.repo_dir
+    assert kwargs["branch"] == "main"
+    assert kwargs["depth"] == 1
+    assert kwargs["single_branch"] is True
+
+
+def test_sync_update_existing_repo(no_git, config_manager, git_repo):
+    """Test syncing by updating existing repository."""
+    config_manager.set("git-repo", "git@github.com:test/repo.git")
+    config_manager.set("git-branch", "main")
+
+    # Create .git directory to simulate existing repo
+    (git_repo.repo_dir / ".git").mkdir(parents=True)
+
+    # Mock Git repository
+    mock_repo = Mock()
+    mock_branch = Mock()
+    mock_branch.name = "main"
+    mock_repo.active_branch = mock_branch
+    mock_repo.head.commit.hexsha = "1111111"
+    mock_repo.git.ls_remote.return_value = "2222222\trefs/heads/main"
+    no_git.return_value = mock_repo
+
+    git_repo.sync()
+
+    # Check that fetch and reset were called correctly (ignoring env)
+    args, kwargs = mock_repo.git.fetch.call_args
+    assert args == ("--depth=1", "--no-tags", "origin", "main")
+    assert mock_repo.git.reset.called
+    args, kwargs = mock_repo.git.reset.call_args
+    assert args == ("--hard", "FETCH_HEAD")
+
+
+def test_get_public_key_valid(config_manager, git_repo, sample_ssh_key):
+    """Test getting valid public key."""
+    # Create users directory and key file
+    users_dir = git_repo.repo_dir / "users"
+    users_dir.mkdir(parents=True)
+    key_file = users_dir / "alice.pub"
+    key_file.write_text(sample_ssh_key)
+
+    result = git_repo.get_public_key("alice")
+    assert result == sample_ssh_key
+
+
+def test_get_public_key_not_found(ro_git_repo):
+    """Test getting public key when file doesn't exist."""
+    with pytest.raises(RuntimeError, match="Public key not found"):
+        ro_git_repo.get_public_key("nonexistent")
+
+
+def test_get_public_key_empty_file(config_manager, git_repo):
+    """Test getting public key from empty file."""
+    users_dir = git_repo.repo_dir / "users"
+    users_dir.mkdir(parents=True)
+    key_file = users_dir / "alice.pub"
+    key_file.write_text("")
+
+    with pytest.raises(RuntimeError, match="Empty public key file"):
+        git_repo.get_public_key("alice")
+
+
+def test_get_public_key_invalid_key(config_manager, git_repo):
+    """Test getting invalid public key."""
+    users_dir = git_repo.repo_dir / "users"
+    users_dir.mkdir(parents=True)
+    key_file = users_dir / "alice.pub"
+    key_file.write_text("invalid key content")
+
+    with pytest.raises(RuntimeError, match="Invalid SSH public key"):
+        git_repo.get_public_key("alice")
+
+
+def test_validate_ssh_public_key_valid(ro_git_repo, sample_ssh_key):
+    """Test validation of valid SSH public key."""
+    assert ro_git_repo._validate_ssh_public_key(sample_ssh_key) is True
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        "invalid key",
+        "ssh-rsa",
+        "",
+        "ssh-unknown AAAAB3NzaC1yc2EAAAADAQABAAABgQC7vbqaj test@example.com",
+        "ssh-rsa invalid_base64! test@example.com",
+    ],
+    ids=[
+        "no-key-type",
+        "no-key-data",
+        "empty",
+        "unsupported-type",
+        "invalid-base64",
+    ],
+)
+def test_validate_ssh_public_key_invalid(ro_git_repo, key):
+    """Test validation rejects malformed and unsupported keys."""
+    assert ro_git_repo._validate_ssh_public_key(key) is False
+
+
+def test_list_users_empty(ro_git_repo):
+    """Test listing users when no users exist."""
+    assert ro_git_repo.list_users() == []
+
+
+def test_list_users_with_keys(git_repo, sample_ssh_key_file):
+    """Test listing users with public keys."""
+    users_dir = git_repo.repo_dir / "users"
+    os.makedirs(users_dir)
+
+    # A hard link is one syscall, rather than open+write+close per key
+    for name in ["alice", "bob", "charlie"]:
+        os.link(sample_ssh_key_file, users_dir / f"{name}.pub")
+
+    users = git_repo.list_users()
+    assert sorted(users) == ["alice", "bob", "charlie"]
+
+
+def test_get_git_env_no_ssh_key(ro_git_repo):
+    """Test getting Git environment without SSH key."""
+    env = ro_git_repo._get_git_env()
+    assert "GIT_SSH_COMMAND" not in env
+
+
+def test_get_git_env_with_ssh_key(config_manager, git_repo, temp_dir):
+    """Test getting Git environment with SSH key."""
+    ssh_key = temp_dir / "ssh_key"
+    ssh_key.write_text("fake key")
+    config_manager.set("ssh-key-path", str(ssh_key))
+
+    env = git_repo._get_git_env()
+    assert "GIT_SSH_COMMAND" in env
+    assert str(ssh_key) in env["GIT_SSH_COMMAND"]
+    assert "StrictHostKeyChecking=no" in env["GIT_SSH_COMMAND"]
 
-        mock_clone.assert_called_once()
-        args, kwargs = mock_clone.call_args
-        assert args[0] == "git@github.com:test/repo.git"
-        assert args[1] == git_repo.repo_dir
-        assert kwargs["branch"] == "main"
-
-    @patch("git.Repo")
-    def test_sync_update_existing_repo(self, mock_repo_class, config_manager, git_repo):
-        """Test syncing by updating existing repository."""
-        config_manager.set("git-repo", "git@github.com:test/repo.git")
-        config_manager.set("git-branch", "main")
-
-        # Create .git directory to simulate existing repo
-        (git_repo.repo_dir / ".git").mkdir(parents=True)
-
-        # Mock Git repository
-        mock_repo = Mock()
-        mock_branch = Mock()
-        mock_branch.name = "main"
-        mock_repo.active_branch = mock_branch
-        mock_remote = Mock()
-        mock_repo.remote.return_value = mock_remote
-        mock_repo_class.return_value = mock_repo
 
+def test_get_git_env_explicit_no_key_skips_config(config_manager, git_repo):
+    """Test that an explicit None means no key rather than re-reading config."""
+    config_manager.set("ssh-key-path", "/path/to/key")
+
+    with patch.object(config_manager, "get_ssh_key_path") as mock_get:
+        env = git_repo._get_git_env(None)
+
+    mock_get.assert_not_called()
+    assert "GIT_SSH_COMMAND" not in env
+
+
+def test_get_repo_info(config_manager, git_repo):
+    """Test getting repository information."""
+    config_manager.set("git-repo", "git@github.com:test/repo.git")
+    config_manager.set("git-branch", "main")
+
+    # Mock Git repository
+    mock_repo = Mock()
+    mock_commit = Mock()
+    mock_commit.hexsha = "abcdef1234567890"
+    mock_commit.committed_datetime.isoformat.return_value = "2023-01-01T12:00:00"
+    mock_commit.message = "Test commit message\n"
+    mock_repo.head.commit = mock_commit
+
+    git_repo._repo = mock_repo
+
+    info = git_repo.get_repo_info()
+
+    assert info["url"] == "git@github.com:test/repo.git"
+    assert info["branch"] == "main"
+    assert info["last_commit"] == "abcdef12"
+    assert info["last_commit_date"] == "2023-01-01T12:00:00"
+    assert info["last_commit_message"] == "Test commit message"
+
+
+def test_get_repo_info_no_repo(ro_git_repo):
+    """Test getting repository information when no repo loaded."""
+    info = ro_git_repo.get_repo_info()
+    assert info == {}
+
+
+def test_sync_git_command_error(no_git, config_manager, git_repo):
+    """Test sync with Git command error."""
+    config_manager.set("git-repo", "invalid-repo-url")
+    no_git.clone_from.side_effect = git.GitCommandError("clone", 128)
+
+    with pytest.raises(RuntimeError, match="Failed to sync Git repository"):
         git_repo.sync()
 
-        mock_repo.remote.assert_called_with("origin")
-        mock_remote.fetch.assert_called_once()
-        # Check that reset was called with the correct arguments (ignoring env)
-        assert mock_repo.git.reset.called
-        args, kwargs = mock_repo.git.reset.call_args
-        assert args == ("--hard", "origin/main")
-
-    def test_get_public_key_valid(self, config_manager, git_repo, sample_ssh_key):
-        """Test getting valid public key."""
-        # Create users directory and key file
-        users_dir = git_repo.repo_dir / "users"
-        users_dir.mkdir(parents=True)
-        key_file = users_dir / "alice.pub"
-        key_file.write_text(sample_ssh_key)
-
-        result = git_repo.get_public_key("alice")
-        assert result == sample_ssh_key
-
-    def test_get_public_key_not_found(self, config_manager, git_repo):
-        """Test getting public key when file doesn't exist."""
-        with pytest.raises(RuntimeError, match="Public key not found"):
-            git_repo.get_public_key("nonexistent")
-
-    def test_get_public_key_empty_file(self, config_manager, git_repo):
-        """Test getting public key from empty file."""
-        users_dir = git_repo.repo_dir / "users"
-        users_dir.mkdir(parents=True)
-        key_file = users_dir / "alice.pub"
-        key_file.write_text("")
-
-        with pytest.raises(RuntimeError, match="Empty public key file"):
-            git_repo.get_public_key("alice")
-
-    def test_get_public_key_invalid_key(self, config_manager, git_repo):
-        """Test getting invalid public key."""
-        users_dir = git_repo.repo_dir / "users"
-        users_dir.mkdir(parents=True)
-        key_file = users_dir / "alice.pub"
-        key_file.write_text("invalid key content")
-
-        with pytest.raises(RuntimeError, match="Invalid SSH public key"):
-            git_repo.get_public_key("alice")
-
-    def test_validate_ssh_public_key_valid(self, git_repo, sample_ssh_key):
-        """Test validation of valid SSH public key."""
-        assert git_repo._validate_ssh_public_key(sample_ssh_key) is True
-
-    def test_validate_ssh_public_key_invalid_format(self, git_repo):
-        """Test validation of invalid SSH public key format."""
-        assert git_repo._validate_ssh_public_key("invalid key") is False
-        assert git_repo._validate_ssh_public_key("ssh-rsa") is False
-        assert git_repo._validate_ssh_public_key("") is False
-
-    def test_validate_ssh_public_key_unsupported_type(self, git_repo):
-        """Test validation of unsupported key type."""
-        invalid_key = (
-            "ssh-unknown AAAAB3NzaC1yc2EAAAADAQABAAABgQC7vbqaj test@example.com"
-        )
-        assert git_repo._validate_ssh_public_key(invalid_key) is False
-
-    def test_validate_ssh_public_key_invalid_base64(self, git_repo):
-        """Test validation of key with invalid base64."""
-        invalid_key = "ssh-rsa invalid_base64! test@example.com"
-        assert git_repo._validate_ssh_public_key(invalid_key) is False
-
-    def test_list_users_empty(self, config_manager, git_repo):
-        """Test listing users when no users exist."""
-        assert git_repo.list_users() == []
-
-    def test_list_users_with_keys(self, config_manager, git_repo, sample_ssh_key):
-        """Test listing users with public keys."""
-        users_dir = git_repo.repo_dir / "users"
-        users_dir.mkdir(parents=True)
-
-        (users_dir / "alice.pub").write_text(sample_ssh_key)
-        (users_dir / "bob.pub").write_text(sample_ssh_key)
-        (users_dir / "charlie.pub").write_text(sample_ssh_key)
-
-        users = git_repo.list_users()
-        assert sorted(users) == ["alice", "bob", "charlie"]
-
-    def test_get_git_env_no_ssh_key(self, config_manager, git_repo):
-        """Test getting Git environment without SSH key."""
-        env = git_repo._get_git_env()
-        assert "GIT_SSH_COMMAND" not in env
-
-    def test_get_git_env_with_ssh_key(self, config_manager, git_repo, temp_dir):
-        """Test getting Git environment with SSH key."""
-        ssh_key = temp_dir / "ssh_key"
-        ssh_key.write_text("fake key")
-        config_manager.set("ssh-key-path", str(ssh_key))
-
-        env = git_repo._get_git_env()
-        assert "GIT_SSH_COMMAND" in env
-        assert str(ssh_key) in env["GIT_SSH_COMMAND"]
-        assert "StrictHostKeyChecking=no" in env["GIT_SSH_COMMAND"]
-
-    @patch("git.Repo")
-    def test_get_repo_info(self, mock_repo_class, config_manager, git_repo):
-        """Test getting repository information."""
-        config_manager.set("git-repo", "git@github.com:test/repo.git")
-        config_manager.set("git-branch", "main")
-
-        # Mock Git repository
-        mock_repo = Mock()
-        mock_commit = Mock()
-        mock_commit.hexsha = "abcdef1234567890"
-        mock_commit.committed_datetime.isoformat.return_value = "2023-01-01T12:00:00"
-        mock_commit.message = "Test commit message\n"
-        mock_repo.head.commit = mock_commit
-
-        git_repo._repo = mock_repo
-
-        info = git_repo.get_repo_info()
-
-        assert info["url"] == "git@github.com:test/repo.git"
-        assert info["branch"] == "main"
-        assert info["last_commit"] == "abcdef12"
-        assert info["last_commit_date"] == "2023-01-01T12:00:00"
-        assert info["last_commit_message"] == "Test commit message"
-
-    def test_get_repo_info_no_repo(self, config_manager, git_repo):
-        """Test getting repository information when no repo loaded."""
-        info = git_repo.get_repo_info()
-        assert info == {}
-
-    def test_sync_git_command_error(self, config_manager, git_repo):
-        """Test sync with Git command error."""
-        config_manager.set("git-repo", "invalid-repo-url")
-
-        with pytest.raises(RuntimeError, match="Failed to sync Git repository"):
-            git_repo.sync()
+
+def test_list_users_ignores_non_key_entries(git_repo, sample_ssh_key):
+    """Test that only regular *.pub files are listed as users."""
+    users_dir = git_repo.repo_dir / "users"
+    users_dir.mkdir(parents=True)
+
+    (users_dir / "alice.pub").write_text(sample_ssh_key)
+    (users_dir / "README.md").write_text("docs")
+    (users_dir / "nested.pub").mkdir()
+
+    assert git_repo.list_users() == ["alice"]
+
+
+def test_validate_ssh_public_key_bad_padding(git_repo):
+    """Test validation rejects misplaced or excess base64 padding."""
+    assert git_repo._validate_ssh_public_key("ssh-rsa AAA=AAAA test") is False
+    assert git_repo._validate_ssh_public_key("ssh-rsa AAAAA=== test") is False
+    assert git_repo._validate_ssh_public_key("ssh-rsa AAAAAA== test") is True
+
+
+def test_sync_switches_branch_in_one_command(no_git, config_manager, git_repo):
+    """Test syncing onto a different branch checks it out at the remote tip."""
+    config_manager.set("git-repo", "git@github.com:test/repo.git")
+    config_manager.set("git-branch", "develop")
+    (git_repo.repo_dir / ".git").mkdir(parents=True)
+
+    mock_repo = Mock()
+    mock_repo.active_branch.name = "main"
+    no_git.return_value = mock_repo
+
+    git_repo.sync()
+
+    mock_repo.git.fetch.assert_called_once()
+    args, _ = mock_repo.git.checkout.call_args
+    assert args == ("-f", "-B", "develop", "FETCH_HEAD")
+    mock_repo.git.reset.assert_not_called()
+
+
+def test_sync_skips_fetch_when_up_to_date(no_git, config_manager, git_repo):
+    """Test syncing skips the fetch when the remote tip is already checked out."""
+    config_manager.set("git-repo", "git@github.com:test/repo.git")
+    (git_repo.repo_dir / ".git").mkdir(parents=True)
+
+    mock_repo = Mock()
+    mock_repo.active_branch.name = "main"
+    mock_repo.head.commit.hexsha = "1111111"
+    mock_repo.git.ls_remote.return_value = "1111111\trefs/heads/main"
+    no_git.return_value = mock_repo
+
+    git_repo.sync()
+
+    args, _ = mock_repo.git.ls_remote.call_args
+    assert args == ("--heads", "origin", "refs/heads/main")
+    mock_repo.git.fetch.assert_not_called()
+    args, _ = mock_repo.git.reset.call_args
+    assert args == ("--hard", "HEAD")
+
+
+def test_get_public_key_too_large(git_repo):
+    """Test that oversized key files are rejected."""
+    users_dir = git_repo.repo_dir / "users"
+    users_dir.mkdir(parents=True)
+    (users_dir / "alice.pub").write_text("ssh-rsa " + "A" * 20000)
+
+    with pytest.raises(RuntimeError, match="too large"):
+        git_repo.get_public_key("alice")
+
+
+def test_get_git_env_only_contains_overrides(config_manager, git_repo):
+    """Test that the Git environment does not copy the process environment."""
+    with patch.dict("os.environ", {"ADDY_TEST_VAR": "1"}):
+        env = git_repo._get_git_env("/path/to/key")
+
+    assert set(env) == {"GIT_SSH_COMMAND"}
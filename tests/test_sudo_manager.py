@@ -2,8 +2,9 @@
 Tests for sudo management.
 """
 
+import os
 import pytest
-from unittest.mock import Mock, patch, MagicMock, mock_open
+from unittest.mock import Mock, patch
 from pathlib import Path
 import subprocess
 
@@ -15,198 +16,288 @@ class TestSudoManager:
     """Test SudoManager functionality."""
 
     @patch("subprocess.run")
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("os.chmod")
-    def test_grant_sudo_success(self, mock_chmod, mock_file, mock_subprocess):
+    def test_grant_sudo_success(self, mock_subprocess, sudo_manager, sudoers_dir):
         """Test successful sudo grant."""
-        mock_subprocess.return_value.returncode = 0  # visudo validation passes
+        # sudo_manager has no user manager: grants still work without one
+        sudo_manager.grant_sudo("testuser")
 
-        with patch("pathlib.Path.exists", return_value=False), patch(
-            "pathlib.Path.rename"
-        ) as mock_rename:
+        sudoers_file = sudoers_dir / "testuser"
+        assert sudoers_file.read_text() == "testuser ALL=(ALL) NOPASSWD:ALL\n"
+        assert sudoers_file.stat().st_mode & 0o777 == 0o440
+        assert not (sudoers_dir / "testuser.tmp").exists()
 
-            sudo_manager = SudoManager()
-            sudo_manager.grant_sudo("testuser")
+    @patch("subprocess.run")
+    def test_grant_sudo_replaces_stale_temp_file(
+        self, mock_subprocess, sudo_manager, sudoers_dir
+    ):
+        """Test a temp file left by an interrupted grant does not block it."""
+        (sudoers_dir / "testuser.tmp").write_text("garbage")
+
+        sudo_manager.grant_sudo("testuser")
 
-            mock_file.assert_called()
-            # Check that chmod was called on the temp file with correct permissions
-            mock_chmod.assert_called()
-            mock_rename.assert_called_once()
+        sudoers_file = sudoers_dir / "testuser"
+        assert sudoers_file.read_text() == "testuser ALL=(ALL) NOPASSWD:ALL\n"
+        assert not (sudoers_dir / "testuser.tmp").exists()
 
-    @patch("pathlib.Path.exists")
-    def test_grant_sudo_already_exists(self, mock_exists):
+    def test_grant_sudo_dotted_username_temp_file(self, sudo_manager, sudoers_dir):
+        """Test the temp file for a dotted username keeps the full name."""
+        with patch.object(
+            SudoManager, "_validate_sudoers_file", return_value=True
+        ) as mock_validate:
+            sudo_manager.grant_sudo("john.doe")
+
+        assert mock_validate.call_args[0][0] == str(sudoers_dir / "john.doe.tmp")
+        assert (sudoers_dir / "john.doe").exists()
+
+    def test_grant_sudo_already_exists(self, sudo_manager, sudoers_dir):
         """Test granting sudo when already configured."""
-        mock_exists.return_value = True
+        (sudoers_dir / "testuser").write_text("testuser ALL=(ALL) ALL\n")
 
-        sudo_manager = SudoManager()
         sudo_manager.grant_sudo("testuser")  # Should not raise exception
 
-    @patch("subprocess.run")
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("os.chmod")
-    @patch("pathlib.Path.unlink")
-    def test_grant_sudo_validation_fails(
-        self, mock_unlink, mock_chmod, mock_file, mock_subprocess
-    ):
+        # The existing rule is left alone
+        assert (sudoers_dir / "testuser").read_text() == "testuser ALL=(ALL) ALL\n"
+
+    def test_grant_sudo_validation_fails(self, sudo_manager, sudoers_dir):
         """Test sudo grant when visudo validation fails."""
-        mock_subprocess.return_value.returncode = 1  # visudo validation fails
+        with patch.object(SudoManager, "_validate_sudoers_file", return_value=False):
+            with pytest.raises(RuntimeError, match="Invalid sudoers configuration"):
+                sudo_manager.grant_sudo("testuser")
 
-        with patch("pathlib.Path.exists", return_value=False):
+        # Temp file should be cleaned up and nothing installed
+        assert list(sudoers_dir.iterdir()) == []
 
-            sudo_manager = SudoManager()
+    def test_grant_sudo_write_error_removes_temp_file(self, sudo_manager, sudoers_dir):
+        """Test an I/O error mid-grant is reported and leaves no temp file."""
+        with patch("os.fsync", side_effect=OSError("No space left on device")):
+            with pytest.raises(RuntimeError, match="No space left on device"):
+                sudo_manager.grant_sudo("testuser")
 
-            with pytest.raises(RuntimeError, match="Invalid sudoers configuration"):
+        assert list(sudoers_dir.iterdir()) == []
+
+    def test_grant_sudo_dir_fsync_error_keeps_grant(self, sudo_manager, sudoers_dir):
+        """Test a failed directory flush doesn't report an installed rule as failed."""
+        sudo_manager.list_sudo_users()  # prime the name snapshot
+        with patch.object(SudoManager, "_validate_sudoers_file", return_value=True):
+            with patch.object(
+                SudoManager, "_fsync_sudoers_dir", side_effect=OSError("EIO")
+            ):
                 sudo_manager.grant_sudo("testuser")
 
-            mock_unlink.assert_called_once()  # Temp file should be cleaned up
+        assert (sudoers_dir / "testuser").exists()
+        assert sudo_manager.has_sudo_access("testuser")
 
-    @patch("pathlib.Path.unlink")
-    @patch("pathlib.Path.exists")
-    def test_revoke_sudo_success(self, mock_exists, mock_unlink):
+    @patch("os.unlink")
+    def test_revoke_sudo_success(self, mock_unlink, sudo_manager):
         """Test successful sudo revocation."""
-        mock_exists.return_value = True
-
-        sudo_manager = SudoManager()
         sudo_manager.revoke_sudo("testuser")
 
         mock_unlink.assert_called_once()
 
-    @patch("pathlib.Path.exists")
-    def test_revoke_sudo_not_configured(self, mock_exists):
+    def test_revoke_sudo_not_configured(self, sudo_manager, sudoers_dir):
         """Test revoking sudo when not configured."""
-        mock_exists.return_value = False
-
-        sudo_manager = SudoManager()
         sudo_manager.revoke_sudo("testuser")  # Should not raise exception
 
-    @patch("pathlib.Path.exists")
-    def test_has_sudo_access_true(self, mock_exists):
+    @patch("os.unlink")
+    def test_revoke_sudo_permission_denied(self, mock_unlink, sudo_manager):
+        """Test revoking sudo reports errors other than a missing file."""
+        mock_unlink.side_effect = PermissionError("Permission denied")
+
+        with pytest.raises(RuntimeError, match="Failed to remove sudo access"):
+            sudo_manager.revoke_sudo("testuser")
+
+    def test_has_sudo_access_true(self, sudo_manager, sudoers_dir):
         """Test checking sudo access when user has access."""
-        mock_exists.return_value = True
+        (sudoers_dir / "testuser").write_text("testuser ALL=(ALL) NOPASSWD:ALL\n")
 
-        sudo_manager = SudoManager()
         assert sudo_manager.has_sudo_access("testuser") is True
 
-    @patch("pathlib.Path.exists")
-    def test_has_sudo_access_false(self, mock_exists):
-        """Test checking sudo access when user doesn't have access."""
-        mock_exists.return_value = False
+    def test_has_sudo_access_dangling_symlink(self, sudo_manager, sudoers_dir):
+        """Test a broken symlink in sudoers.d still counts as present."""
+        (sudoers_dir / "testuser").symlink_to(sudoers_dir / "missing")
+
+        assert sudo_manager.has_sudo_access("testuser") is True
+
+        # revoke_sudo cleans it up rather than reporting nothing to do
+        sudo_manager.revoke_sudo("testuser")
+
+        assert not os.path.lexists(sudoers_dir / "testuser")
 
-        sudo_manager = SudoManager()
+    def test_has_sudo_access_false(self, sudo_manager, sudoers_dir):
+        """Test checking sudo access when user doesn't have access."""
         assert sudo_manager.has_sudo_access("testuser") is False
 
-    def test_list_sudo_users_empty(self):
-        """Test listing sudo users when sudoers.d doesn't exist."""
-        with patch("pathlib.Path.exists", return_value=False):
-            sudo_manager = SudoManager()
-            users = sudo_manager.list_sudo_users()
-            assert users == []
+    @patch("subprocess.run")
+    def test_list_sudo_users_set_answers_has_sudo_access(
+        self, mock_subprocess, sudo_manager, sudoers_dir
+    ):
+        """Test has_sudo_access uses the snapshot and stays current."""
+        (sudoers_dir / "alice").write_text("alice ALL=(ALL) NOPASSWD:ALL\n")
 
-    def test_list_sudo_users_with_users(self):
-        """Test listing sudo users with addy-managed files."""
-        # Mock directory contents
-        mock_alice = Mock()
-        mock_alice.name = "alice"
-        mock_alice.is_file.return_value = True
+        assert sudo_manager.list_sudo_users_set() == frozenset({"alice"})
 
-        mock_bob = Mock()
-        mock_bob.name = "bob"
-        mock_bob.is_file.return_value = True
+        sudo_manager.grant_sudo("bob")
+        sudo_manager.revoke_sudo("alice")
 
-        mock_hidden = Mock()
-        mock_hidden.name = ".hidden"
-        mock_hidden.is_file.return_value = True
+        with patch("os.path.lexists") as mock_lexists:
+            assert sudo_manager.has_sudo_access("bob") is True
+            assert sudo_manager.has_sudo_access("alice") is False
 
-        mock_charlie = Mock()
-        mock_charlie.name = "charlie"
-        mock_charlie.is_file.return_value = True
+            mock_lexists.assert_not_called()
 
-        mock_files = [mock_alice, mock_bob, mock_hidden, mock_charlie]
+    def test_list_sudo_users_set_no_directory(self, sudo_manager, missing_sudoers_dir):
+        """Test the sudoers snapshot is empty when sudoers.d doesn't exist."""
+        assert sudo_manager.list_sudo_users_set() == frozenset()
 
-        # Mock the _is_addy_sudoers_file method instead
-        def mock_is_addy_file(file_path):
-            filename = file_path.name
-            return filename in [
-                "alice",
-                "charlie",
-            ]  # Only alice and charlie are addy-managed
+    def test_list_sudo_users_empty(self, sudo_manager, missing_sudoers_dir):
+        """Test listing sudo users when sudoers.d doesn't exist."""
+        assert sudo_manager.list_sudo_users() == []
 
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.iterdir", return_value=mock_files
-        ), patch.object(
-            SudoManager, "_is_addy_sudoers_file", side_effect=mock_is_addy_file
-        ):
+    def test_list_sudo_users_with_users(self, sudo_manager, sudoers_dir):
+        """Test listing sudo users with addy-managed files."""
+        for name in ["alice", "charlie"]:
+            (sudoers_dir / name).write_text(f"{name} ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "bob").write_text("bob ALL=(ALL) ALL\n")  # Not addy-managed
+        (sudoers_dir / ".hidden").write_text(".hidden ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "subdir").mkdir()
+
+        users = sudo_manager.list_sudo_users()
+
+        assert sorted(users) == ["alice", "charlie"]
+
+    def test_list_sudo_users_skips_foreign_names(self, sudo_manager, sudoers_dir):
+        """Test files addy could not have written are not even opened."""
+        (sudoers_dir / "alice").write_text("alice ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "alice~").write_text("alice ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "90-cloud-init-users").write_text(
+            "# Created by cloud-init\n\n"
+            "# User rules for ubuntu\n"
+            "ubuntu ALL=(ALL) NOPASSWD:ALL\n"
+        )
+        (sudoers_dir / "README").write_text("Files in this directory are read\n")
 
-            sudo_manager = SudoManager()
-            users = sudo_manager.list_sudo_users()
+        with patch.object(
+            sudo_manager, "_read_rule", wraps=sudo_manager._read_rule
+        ) as spy:
+            assert sudo_manager.list_sudo_users() == ["alice"]
 
-            assert sorted(users) == ["alice", "charlie"]
+        assert [call.args[0].name for call in spy.call_args_list] == ["alice"]
+
+    @pytest.mark.parametrize("username", ["Alice", "1bob"])
+    def test_list_sudo_users_any_valid_username(
+        self, mock_subprocess, sudo_manager, sudoers_dir, username
+    ):
+        """Test grants for upper-case and digit-led names are listed and checked."""
+        sudo_manager.grant_sudo(username)
+
+        assert sudo_manager.list_sudo_users() == [username]
+        assert sudo_manager.verify_sudoers_integrity()["valid_files"] == [username]
 
     @patch("subprocess.run")
-    def test_validate_sudoers_file_valid(self, mock_subprocess):
+    def test_validate_sudoers_file_valid(self, mock_subprocess, sudo_manager):
         """Test validating a valid sudoers file."""
         mock_subprocess.return_value.returncode = 0
 
-        sudo_manager = SudoManager()
         assert sudo_manager._validate_sudoers_file(Path("/tmp/test")) is True
 
     @patch("subprocess.run")
-    def test_validate_sudoers_file_invalid(self, mock_subprocess):
+    def test_validate_sudoers_file_invalid(self, mock_subprocess, sudo_manager):
         """Test validating an invalid sudoers file."""
         mock_subprocess.return_value.returncode = 1
         mock_subprocess.return_value.stderr = "syntax error"
 
-        sudo_manager = SudoManager()
         assert sudo_manager._validate_sudoers_file(Path("/tmp/test")) is False
 
     @patch("subprocess.run")
-    def test_validate_sudoers_file_visudo_not_found(self, mock_subprocess):
+    def test_validate_sudoers_file_visudo_not_found(
+        self, mock_subprocess, sudo_manager
+    ):
         """Test validating when visudo command is not found."""
         mock_subprocess.side_effect = FileNotFoundError("visudo not found")
 
-        sudo_manager = SudoManager()
         assert (
             sudo_manager._validate_sudoers_file(Path("/tmp/test")) is True
         )  # Assume valid
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_is_addy_sudoers_file_true(self, mock_file):
-        """Test identifying addy-managed sudoers file."""
-        mock_file.return_value.read.return_value = "testuser ALL=(ALL) NOPASSWD:ALL"
+    @patch("subprocess.run")
+    def test_validate_sudoers_file_addy_rule_skips_visudo(
+        self, mock_subprocess, temp_dir, sudo_manager
+    ):
+        """Test that addy's own rule format is accepted without visudo."""
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) NOPASSWD:ALL\n")
+
+        assert sudo_manager._validate_sudoers_file(test_file) is True
+        mock_subprocess.assert_not_called()
 
-        sudo_manager = SudoManager()
-        test_file = Path("/etc/sudoers.d/testuser")
+    @patch("subprocess.run")
+    def test_validate_sudoers_file_other_content_uses_visudo(
+        self, mock_subprocess, temp_dir, sudo_manager
+    ):
+        """Test that anything but a plain addy rule is still checked by visudo."""
+        mock_subprocess.return_value.returncode = 0
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) ALL\n")
+
+        assert sudo_manager._validate_sudoers_file(test_file) is True
+        mock_subprocess.assert_called_once()
+
+    @patch("subprocess.run")
+    def test_validate_sudoers_file_dotted_username_skips_visudo(
+        self, mock_subprocess, temp_dir, sudo_manager
+    ):
+        """Test that addy's rule for a dotted username is accepted in-process."""
+        test_file = temp_dir / "test.user.tmp"
+        test_file.write_text("test.user ALL=(ALL) NOPASSWD:ALL\n")
+
+        assert sudo_manager._validate_sudoers_file(test_file) is True
+        mock_subprocess.assert_not_called()
+
+    def test_is_addy_sudoers_file_true(self, temp_dir, sudo_manager):
+        """Test identifying addy-managed sudoers file."""
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) NOPASSWD:ALL\n")
 
         assert sudo_manager._is_addy_sudoers_file(test_file) is True
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_is_addy_sudoers_file_false(self, mock_file):
+    def test_is_addy_sudoers_file_false(self, temp_dir, sudo_manager):
         """Test identifying non-addy sudoers file."""
-        mock_file.return_value.read.return_value = (
-            "testuser ALL=(ALL) ALL"  # Missing NOPASSWD
-        )
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) ALL")  # Missing NOPASSWD
 
-        sudo_manager = SudoManager()
-        test_file = Path("/etc/sudoers.d/testuser")
+        assert sudo_manager._is_addy_sudoers_file(test_file) is False
+
+    def test_is_addy_sudoers_file_oversized(self, temp_dir, sudo_manager):
+        """Test that large files are rejected without comparing content."""
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) NOPASSWD:ALL" + " " * 200)
 
         assert sudo_manager._is_addy_sudoers_file(test_file) is False
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("pathlib.Path.stat")
-    @patch("pathlib.Path.exists")
-    def test_get_sudo_info_success(self, mock_exists, mock_stat, mock_file):
-        """Test getting sudo information successfully."""
-        mock_exists.return_value = True
+    def test_is_addy_sudoers_file_missing(self, temp_dir, sudo_manager):
+        """Test that unreadable files are not treated as addy-managed."""
+        assert sudo_manager._is_addy_sudoers_file(temp_dir / "nobody") is False
 
-        # Mock file stats
-        mock_stat_result = Mock()
-        mock_stat_result.st_mode = 0o100440  # Regular file with 440 permissions
-        mock_stat.return_value = mock_stat_result
+    def test_is_addy_sudoers_file_noatime_refused(self, temp_dir, sudo_manager):
+        """Test reading falls back to a plain open when O_NOATIME is refused."""
+        test_file = temp_dir / "testuser"
+        test_file.write_text("testuser ALL=(ALL) NOPASSWD:ALL\n")
+        real_open = os.open
 
-        # Mock file content
-        mock_file.return_value.read.return_value = "testuser ALL=(ALL) NOPASSWD:ALL"
+        def fake_open(path, flags, *args):
+            if flags & getattr(os, "O_NOATIME", 0):
+                raise PermissionError("O_NOATIME not permitted")
+            return real_open(path, flags, *args)
+
+        with patch("os.open", side_effect=fake_open):
+            assert sudo_manager._is_addy_sudoers_file(test_file) is True
+
+    def test_get_sudo_info_success(self, sudo_manager, sudoers_dir):
+        """Test getting sudo information successfully."""
+        sudoers_file = sudoers_dir / "testuser"
+        sudoers_file.write_text("testuser ALL=(ALL) NOPASSWD:ALL\n")
+        sudoers_file.chmod(0o440)
 
-        sudo_manager = SudoManager()
         info = sudo_manager.get_sudo_info("testuser")
 
         assert info is not None
@@ -215,85 +306,115 @@ class TestSudoManager:
         assert info["content"] == "testuser ALL=(ALL) NOPASSWD:ALL"
         assert info["is_addy_managed"] is True
 
-    @patch("pathlib.Path.exists")
-    def test_get_sudo_info_not_found(self, mock_exists):
+    def test_get_sudo_info_not_found(self, sudo_manager, sudoers_dir):
         """Test getting sudo info when file doesn't exist."""
-        mock_exists.return_value = False
-
-        sudo_manager = SudoManager()
         info = sudo_manager.get_sudo_info("nonexistent")
 
         assert info is None
 
     @patch("subprocess.run")
-    def test_verify_sudoers_integrity(self, mock_subprocess):
+    def test_verify_sudoers_integrity(self, mock_subprocess, sudo_manager, sudoers_dir):
         """Test verifying sudoers integrity."""
         mock_subprocess.return_value.returncode = 0  # All files valid
 
-        # Mock directory and files
-        mock_alice = Mock()
-        mock_alice.name = "alice"
-        mock_alice.is_file.return_value = True
+        for name in ["alice", "bob"]:
+            (sudoers_dir / name).write_text(f"{name} ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "other").write_text("%admin ALL=(ALL) ALL\n")
+
+        results = sudo_manager.verify_sudoers_integrity()
 
-        mock_bob = Mock()
-        mock_bob.name = "bob"
-        mock_bob.is_file.return_value = True
+        assert sorted(results["valid_files"]) == ["alice", "bob"]
+        assert results["invalid_files"] == []
+        assert results["errors"] == []
+        mock_subprocess.assert_not_called()  # Plain addy rules skip visudo
 
-        mock_files = [mock_alice, mock_bob]
+    @pytest.mark.parametrize(
+        "extra", ["carol ALL=(ALL\n", "%wheel ALL=(ALL) ALL # " + "x" * 200 + "\n"]
+    )
+    def test_verify_sudoers_integrity_edited_file(
+        self, mock_subprocess, sudo_manager, sudoers_dir, extra
+    ):
+        """Test an edited addy file, short or oversized, is reported."""
+        (sudoers_dir / "alice").write_text("alice ALL=(ALL) NOPASSWD:ALL\n")
+        (sudoers_dir / "carol").write_text("carol ALL=(ALL) NOPASSWD:ALL\n" + extra)
+
+        results = sudo_manager.verify_sudoers_integrity()
+
+        assert results["valid_files"] == ["alice"]
+        assert results["invalid_files"] == []
+        assert results["errors"] == [
+            "Sudoers file carol was modified after addy wrote it"
+        ]
+        # The edited file is not addy-managed anywhere else either
+        assert sudo_manager.list_sudo_users() == ["alice"]
+        assert sudo_manager.get_sudo_info("carol")["is_addy_managed"] is False
+
+    def test_verify_sudoers_integrity_visudo_rejects(
+        self, mock_subprocess, sudo_manager, sudoers_dir
+    ):
+        """Test addy files outside the fast-path pattern go through visudo."""
+        mock_subprocess.return_value.returncode = 1
+        (sudoers_dir / "Alice").write_text("Alice ALL=(ALL) NOPASSWD:ALL\n")
 
-        # Mock the _is_addy_sudoers_file method to return True for both files
-        def mock_is_addy_file(file_path):
-            return True  # Both files are addy-managed
+        results = sudo_manager.verify_sudoers_integrity()
 
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.iterdir", return_value=mock_files
-        ), patch.object(
-            SudoManager, "_is_addy_sudoers_file", side_effect=mock_is_addy_file
-        ):
+        assert results["invalid_files"] == ["Alice"]
+        assert mock_subprocess.call_args.args[0] == [
+            "visudo",
+            "-c",
+            "-f",
+            str(sudoers_dir / "Alice"),
+        ]
 
-            sudo_manager = SudoManager()
+    def test_verify_sudoers_integrity_unreadable(self, sudo_manager, sudoers_dir):
+        """Test files that can't be read are reported, not skipped."""
+        (sudoers_dir / "alice").write_text("alice ALL=(ALL) NOPASSWD:ALL\n")
+
+        with patch.object(sudo_manager, "_read_rule", return_value=None):
             results = sudo_manager.verify_sudoers_integrity()
 
-            assert sorted(results["valid_files"]) == ["alice", "bob"]
-            assert results["invalid_files"] == []
-            assert results["errors"] == []
+        assert results["valid_files"] == []
+        assert results["errors"] == ["Cannot read sudoers file: alice"]
+
+    def test_verify_sudoers_integrity_many_files(self, sudo_manager, sudoers_dir):
+        """Test verifying integrity when files are read concurrently."""
+        expected = []
+        for i in range(100):
+            name = f"user{i:03d}"
+            if i % 4 == 0:
+                (sudoers_dir / name).write_text(f"{name} ALL=(ALL) ALL\n")
+            else:
+                (sudoers_dir / name).write_text(f"{name} ALL=(ALL) NOPASSWD:ALL\n")
+                expected.append(name)
 
-    def test_verify_sudoers_integrity_no_directory(self):
+        results = sudo_manager.verify_sudoers_integrity()
+
+        assert sorted(results["valid_files"]) == expected
+        assert results["invalid_files"] == []
+
+    def test_verify_sudoers_integrity_no_directory(
+        self, sudo_manager, missing_sudoers_dir
+    ):
         """Test verifying integrity when sudoers.d doesn't exist."""
-        with patch("pathlib.Path.exists", return_value=False):
-            sudo_manager = SudoManager()
-            results = sudo_manager.verify_sudoers_integrity()
+        results = sudo_manager.verify_sudoers_integrity()
 
-            assert "Sudoers directory does not exist" in results["errors"]
+        assert "Sudoers directory does not exist" in results["errors"]
 
     @patch("subprocess.run")
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("os.chmod")
-    def test_grant_sudo_with_user_creation(
-        self, mock_chmod, mock_file, mock_subprocess
-    ):
+    def test_grant_sudo_with_user_creation(self, mock_subprocess, sudoers_dir):
         """Test granting sudo with user creation when user doesn't exist."""
-        mock_subprocess.return_value.returncode = 0  # visudo validation passes
-
         # Mock user manager
         mock_user_manager = Mock()
         mock_user_manager.user_exists.return_value = False
 
-        with patch("pathlib.Path.exists", return_value=False), patch(
-            "pathlib.Path.rename"
-        ) as mock_rename:
-
-            sudo_manager = SudoManager(mock_user_manager)
-            sudo_manager.grant_sudo("testuser", create_user=True)
+        sudo_manager = SudoManager(mock_user_manager)
+        sudo_manager.grant_sudo("testuser", create_user=True)
 
-            # User should be created
-            mock_user_manager.create_user.assert_called_once_with("testuser")
+        # User should be created
+        mock_user_manager.create_user.assert_called_once_with("testuser")
 
-            # Sudo should be granted
-            mock_file.assert_called()
-            # Check that chmod was called on the temp file with correct permissions
-            mock_chmod.assert_called()
-            mock_rename.assert_called_once()
+        # Sudo should be granted
+        assert (sudoers_dir / "testuser").exists()
 
     def test_grant_sudo_user_not_exists_no_create(self):
         """Test granting sudo when user doesn't exist and create_user=False."""
@@ -309,54 +430,28 @@ class TestSudoManager:
         mock_user_manager.create_user.assert_not_called()
 
     @patch("subprocess.run")
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("os.chmod")
     def test_grant_sudo_user_exists_no_creation_needed(
-        self, mock_chmod, mock_file, mock_subprocess
+        self, mock_subprocess, sudoers_dir
     ):
         """Test granting sudo when user exists - no creation needed."""
-        mock_subprocess.return_value.returncode = 0  # visudo validation passes
-
         # Mock user manager
         mock_user_manager = Mock()
         mock_user_manager.user_exists.return_value = True
 
-        with patch("pathlib.Path.exists", return_value=False), patch(
-            "pathlib.Path.rename"
-        ) as mock_rename:
-
-            sudo_manager = SudoManager(mock_user_manager)
-            sudo_manager.grant_sudo("testuser", create_user=True)
-
-            # User should not be created since they already exist
-            mock_user_manager.create_user.assert_not_called()
-
-            # Sudo should be granted
-            mock_file.assert_called()
-            mock_rename.assert_called_once()
-
-    def test_grant_sudo_no_user_manager(self):
-        """Test granting sudo when no user manager is provided."""
-        # This maintains backward compatibility
-        sudo_manager = SudoManager()
+        sudo_manager = SudoManager(mock_user_manager)
+        sudo_manager.grant_sudo("testuser", create_user=True)
 
-        with patch("pathlib.Path.exists", return_value=False):
-            with patch("subprocess.run") as mock_subprocess, patch(
-                "builtins.open", new_callable=mock_open
-            ), patch("os.chmod"), patch("pathlib.Path.rename"):
+        # User should not be created since they already exist
+        mock_user_manager.create_user.assert_not_called()
 
-                mock_subprocess.return_value.returncode = 0
-
-                # Should work without user manager (backward compatibility)
-                sudo_manager.grant_sudo("testuser")
+        # Sudo should be granted
+        assert (sudoers_dir / "testuser").exists()
 
     def test_revoke_sudo_with_remove_ssh(self):
         """Test revoking sudo with SSH removal."""
         mock_user_manager = Mock()
 
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.unlink"
-        ) as mock_unlink:
+        with patch("os.unlink") as mock_unlink:
 
             sudo_manager = SudoManager(mock_user_manager)
             sudo_manager.revoke_sudo("testuser", remove_ssh=True)
@@ -374,9 +469,7 @@ class TestSudoManager:
         """Test revoking sudo with user deletion."""
         mock_user_manager = Mock()
 
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.unlink"
-        ) as mock_unlink:
+        with patch("os.unlink") as mock_unlink:
 
             sudo_manager = SudoManager(mock_user_manager)
             sudo_manager.revoke_sudo("testuser", delete_user=True)
@@ -390,13 +483,9 @@ class TestSudoManager:
             # User should be deleted
             mock_user_manager.delete_user.assert_called_once_with("testuser")
 
-    def test_revoke_sudo_no_user_manager(self):
+    def test_revoke_sudo_no_user_manager(self, sudo_manager):
         """Test revoking sudo without user manager."""
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.unlink"
-        ) as mock_unlink:
-
-            sudo_manager = SudoManager()
+        with patch("os.unlink") as mock_unlink:
             sudo_manager.revoke_sudo("testuser", remove_ssh=True, delete_user=True)
 
             # Only sudo should be revoked (no user manager available)
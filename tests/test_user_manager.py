@@ -2,216 +2,357 @@
 Tests for user management.
 """
 
+import builtins
+import os
+import pwd
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import Mock, mock_open, patch
 from pathlib import Path
 import subprocess
 
 from addy.user_manager import UserManager
 
+# Keep this module on one xdist worker under --dist=loadgroup too, so the
+# module-scoped UserManager is only built once
+pytestmark = pytest.mark.xdist_group("user_manager")
+
+
+@pytest.fixture(autouse=True)
+def mocks(monkeypatch):
+    """Replace the pwd lookups, commands and ownership changes UserManager makes.
+
+    Plain monkeypatch swaps of Mock objects, set up once for every test
+    instead of a stack of patch decorators. Returns the mocks by short name.
+    """
+    fakes = SimpleNamespace(getpwnam=Mock(), run=Mock(), chown=Mock(), chmod=Mock())
+    monkeypatch.setattr(pwd, "getpwnam", fakes.getpwnam)
+    monkeypatch.setattr(subprocess, "run", fakes.run)
+    monkeypatch.setattr(os, "chown", fakes.chown)
+    monkeypatch.setattr(os, "chmod", fakes.chmod)
+    return fakes
+
 
 class TestUserManager:
     """Test UserManager functionality."""
 
-    def test_user_exists_true(self, mock_pwd):
+    def test_user_exists_true(self, user_manager, mocks):
         """Test checking if user exists when user exists."""
-        mock_getpwnam, _ = mock_pwd
-        user_manager = UserManager()
-
         assert user_manager.user_exists("testuser") is True
-        mock_getpwnam.assert_called_with("testuser")
+        mocks.getpwnam.assert_called_with("testuser")
 
-    def test_user_exists_false(self, mock_pwd):
+    def test_user_exists_false(self, user_manager, mocks):
         """Test checking if user exists when user doesn't exist."""
-        mock_getpwnam, _ = mock_pwd
-        mock_getpwnam.side_effect = KeyError("User not found")
-        user_manager = UserManager()
+        mocks.getpwnam.side_effect = KeyError("User not found")
 
         assert user_manager.user_exists("nonexistent") is False
 
-    @patch("subprocess.run")
-    @patch("pwd.getpwnam")
-    def test_create_user_success(
-        self, mock_getpwnam, mock_subprocess, mock_os_operations
+    @pytest.mark.parametrize("exists", [False, True])
+    def test_create_user(self, user_manager, mocks, make_pw, exists):
+        """Test creating a new user, and creating one that already exists."""
+        mock_user = make_pw("newuser")
+        if exists:
+            mocks.getpwnam.return_value = mock_user
+        else:
+            # First call (user_exists) raises KeyError, second call succeeds
+            mocks.getpwnam.side_effect = [KeyError("User not found"), mock_user]
+        mocks.run.return_value.stdout = ""
+
+        with patch.object(Path, "mkdir"):
+            user_manager.create_user("newuser")  # Should not raise exception
+
+        if exists:
+            mocks.run.assert_not_called()
+        else:
+            args = mocks.run.call_args.args[0]
+            assert "useradd" in args
+            assert "-m" in args
+            assert "newuser" in args
+
+    def test_create_users_bulk(
+        self, temp_dir, user_manager, mocks, make_pw, monkeypatch
     ):
-        """Test successful user creation."""
-        # First call (user_exists) raises KeyError, second call succeeds
-        mock_user = Mock()
-        mock_user.pw_dir = "/home/newuser"  # Use real string path
-        mock_user.pw_uid = 1000
-        mock_user.pw_gid = 1000
-        mock_getpwnam.side_effect = [KeyError("User not found"), mock_user]
-        mock_subprocess.return_value.returncode = 0
-        mock_subprocess.return_value.stdout = ""
-
-        with patch("pathlib.Path.mkdir") as mock_mkdir, patch("os.chown") as mock_chown:
-
-            user_manager = UserManager()
-            user_manager.create_user("newuser")
+        """Test bulk creation feeds every new user to a single newusers run."""
+        skel = temp_dir / "skel"
+        skel.mkdir()
+        (skel / ".bashrc").write_text("# skel\n")
+        home_base = temp_dir / "home"
+        users = {"carol": make_pw("carol", uid=1002, gid=1002)}
+        mocks.getpwnam.side_effect = lambda name: users[name]
+
+        def run(cmd, **kwargs):
+            if cmd == ["useradd", "-D"]:
+                return Mock(stdout=f"GROUP=100\nHOME={home_base}\nSKEL={skel}\n")
+            for line in kwargs["input"].splitlines():
+                name = line.split(":")[0]
+                users[name] = make_pw(name, home=str(home_base / name))
+                (home_base / name).mkdir(mode=0o700, parents=True)
+            return Mock(stdout="")
+
+        mocks.run.side_effect = run
+        lchown = Mock()
+        monkeypatch.setattr(os, "lchown", lchown)
+        monkeypatch.setattr(user_manager, "_setup_ssh_directory", Mock())
+
+        user_manager.create_users_bulk(["alice", "bob", "carol", "alice"])
+
+        assert mocks.run.call_count == 2
+        assert mocks.run.call_args.args[0] == ["newusers", "--encrypted"]
+        assert mocks.run.call_args.kwargs["input"] == (
+            f"alice:!::::{home_base}/alice:/bin/bash\n"
+            f"bob:!::::{home_base}/bob:/bin/bash\n"
+        )
+        # Skeleton files are copied in and handed to the new accounts only
+        for name in ["alice", "bob"]:
+            bashrc = home_base / name / ".bashrc"
+            assert bashrc.read_text() == "# skel\n"
+            lchown.assert_any_call(str(bashrc), 1000, 1000)
+            # The home directory keeps its own permissions, not skel's
+            assert (home_base / name).stat().st_mode & 0o777 == 0o700
+        # .ssh is set up for the new accounts only
+        assert [
+            c.args[0] for c in user_manager._setup_ssh_directory.call_args_list
+        ] == ["alice", "bob"]
+
+    def test_create_users_bulk_without_newusers(self, user_manager, mocks):
+        """Test bulk creation falls back to useradd when newusers is missing."""
+        mocks.getpwnam.side_effect = KeyError("User not found")
+        mocks.run.side_effect = FileNotFoundError("newusers")
+
+        with patch.object(UserManager, "create_user") as mock_create_user:
+            user_manager.create_users_bulk(["alice", "bob"])
+
+        assert [c.args for c in mock_create_user.call_args_list] == [
+            ("alice", "/bin/bash"),
+            ("bob", "/bin/bash"),
+        ]
+
+    def test_create_users_bulk_setup_fails(
+        self, user_manager, mocks, make_pw, monkeypatch
+    ):
+        """Test a failed setup step removes every account the batch created."""
+        users = {}
+        mocks.getpwnam.side_effect = lambda name: users[name]
+
+        def run(cmd, **kwargs):
+            if cmd == ["useradd", "-D"]:
+                return Mock(stdout="HOME=/home\nSKEL=/etc/skel\n")
+            if cmd[0] == "newusers":
+                for line in kwargs["input"].splitlines():
+                    name = line.split(":")[0]
+                    users[name] = make_pw(name)
+            elif cmd[0] == "userdel":
+                users.pop(cmd[-1])
+            return Mock(stdout="")
+
+        mocks.run.side_effect = run
+        monkeypatch.setattr(user_manager, "_copy_skel", Mock())
+        monkeypatch.setattr(
+            user_manager,
+            "_setup_ssh_directory",
+            Mock(side_effect=[None, OSError("Permission denied")]),
+        )
+
+        with pytest.raises(RuntimeError, match="Permission denied"):
+            user_manager.create_users_bulk(["alice", "bob"])
+
+        assert [c.args[0] for c in mocks.run.call_args_list[2:]] == [
+            ["userdel", "-r", "alice"],
+            ["userdel", "-r", "bob"],
+        ]
+        assert user_manager.user_exists("alice") is False
+        assert user_manager.user_exists("bob") is False
+
+    def test_create_users_bulk_rejects_invalid_username(self, user_manager, mocks):
+        """Test a username that could inject a newusers line is rejected."""
+        with pytest.raises(RuntimeError, match="Invalid username"):
+            user_manager.create_users_bulk(["alice", "evil:x:0:0::/root:/bin/sh"])
 
-        mock_subprocess.assert_called()
-        args = mock_subprocess.call_args[0][0]
-        assert "useradd" in args
-        assert "-m" in args
-        assert "newuser" in args
+        mocks.run.assert_not_called()
 
-    @patch("pwd.getpwnam")
-    def test_create_user_already_exists(self, mock_getpwnam):
-        """Test creating user that already exists."""
-        mock_user = Mock()
-        mock_getpwnam.return_value = mock_user
+    def test_create_user_rejects_invalid_username(self, user_manager, mocks):
+        """Test create_user applies the same username rule as bulk creation."""
+        with pytest.raises(RuntimeError, match="Invalid username"):
+            user_manager.create_user("_svc")
 
-        user_manager = UserManager()
-        user_manager.create_user("existinguser")  # Should not raise exception
+        mocks.run.assert_not_called()
 
-    @patch("subprocess.run")
-    @patch("pwd.getpwnam")
-    def test_create_user_command_fails(self, mock_getpwnam, mock_subprocess):
+    def test_create_user_command_fails(self, user_manager, mocks):
         """Test user creation when useradd command fails."""
-        mock_getpwnam.side_effect = KeyError("User not found")
-        mock_subprocess.side_effect = subprocess.CalledProcessError(
+        mocks.getpwnam.side_effect = KeyError("User not found")
+        mocks.run.side_effect = subprocess.CalledProcessError(
             1, "useradd", stderr="Permission denied"
         )
 
-        user_manager = UserManager()
-
         with pytest.raises(RuntimeError, match="Failed to create user"):
             user_manager.create_user("newuser")
 
-    @patch("builtins.open", create=True)
-    @patch("os.chmod")
-    @patch("os.chown")
-    @patch("pwd.getpwnam")
-    def test_install_ssh_key_success(
-        self, mock_getpwnam, mock_chown, mock_chmod, mock_open
+    def test_create_user_ssh_setup_fails(
+        self, user_manager, mocks, make_pw, monkeypatch
     ):
+        """Test a failed SSH setup removes the user and forgets its entry."""
+        mocks.getpwnam.side_effect = [
+            KeyError("User not found"),
+            make_pw("newuser"),
+            KeyError("User not found"),
+        ]
+
+        def setup_ssh_directory(username):
+            user_manager._get_pw(username)
+            raise OSError("Permission denied")
+
+        monkeypatch.setattr(user_manager, "_setup_ssh_directory", setup_ssh_directory)
+
+        with pytest.raises(RuntimeError, match="Failed to setup SSH directory"):
+            user_manager.create_user("newuser")
+
+        mocks.run.assert_called_with(["userdel", "-r", "newuser"], capture_output=True)
+        # The deleted account isn't answered from the cache
+        assert user_manager.user_exists("newuser") is False
+
+    def test_install_ssh_key_success(self, user_manager, mocks, make_pw):
         """Test successful SSH key installation."""
         # Mock user info
-        mock_user = Mock()
-        mock_user.pw_uid = 1000
-        mock_user.pw_gid = 1000
-        mock_user.pw_dir = "/home/testuser"
-        mock_getpwnam.return_value = mock_user
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
 
         # Mock file operations
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
+        m = mock_open()
 
-        with patch("pathlib.Path.exists", return_value=False), patch(
-            "pathlib.Path.mkdir"
-        ):
+        with patch.object(builtins, "open", m), patch.object(Path, "mkdir"):
+            user_manager.install_ssh_key(
+                "testuser", "ssh-rsa AAAAB3... test@example.com"
+            )
 
-            user_manager = UserManager()
+            m().write.assert_called_once_with("ssh-rsa AAAAB3... test@example.com\n")
+            mocks.chmod.assert_called()
+            mocks.chown.assert_called()
+
+    def test_install_ssh_key_looks_up_user_once(self, user_manager, mocks, make_pw):
+        """Test that the passwd entry is fetched once per user."""
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
+
+        with patch.object(builtins, "open", mock_open()), patch.object(Path, "mkdir"):
             user_manager.install_ssh_key(
                 "testuser", "ssh-rsa AAAAB3... test@example.com"
             )
 
-            mock_file.write.assert_called_once()
-            mock_chmod.assert_called()
-            mock_chown.assert_called()
+        mocks.getpwnam.assert_called_once_with("testuser")
+
+    def test_delete_user_forgets_cached_entry(self, user_manager, mocks, make_pw):
+        """Test that a deleted user is looked up again afterwards."""
+        mocks.getpwnam.return_value = make_pw()
+        mocks.run.return_value.stdout = ""
 
-    @patch("builtins.open", create=True)
-    @patch("pwd.getpwnam")
-    def test_install_ssh_key_already_exists(self, mock_getpwnam, mock_open):
+        user_manager.delete_user("testuser")
+
+        mocks.getpwnam.side_effect = KeyError("User not found")
+        assert user_manager.user_exists("testuser") is False
+
+    def test_install_ssh_key_already_exists(self, user_manager, mocks, make_pw):
         """Test installing SSH key that already exists."""
         # Mock user info
-        mock_user = Mock()
-        mock_user.pw_uid = 1000
-        mock_user.pw_gid = 1000
-        mock_user.pw_dir = "/home/testuser"
-        mock_getpwnam.return_value = mock_user
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
 
         # Mock file with existing key
         test_key = "ssh-rsa AAAAB3... test@example.com"
-        mock_file = MagicMock()
-        mock_file.read.return_value = test_key
-        mock_open.return_value.__enter__.return_value = mock_file
-
-        with patch("pathlib.Path.exists", return_value=True), patch(
-            "pathlib.Path.mkdir"
-        ), patch("os.chown"), patch("os.chmod"):
+        m = mock_open(read_data=f"{test_key}\n")
 
-            user_manager = UserManager()
+        with patch.object(builtins, "open", m), patch.object(Path, "mkdir"):
             user_manager.install_ssh_key("testuser", test_key)
 
             # Should not write again
-            mock_file.write.assert_not_called()
+            m().write.assert_not_called()
 
-    @patch("pwd.getpwnam")
-    def test_install_ssh_key_user_not_found(self, mock_getpwnam):
-        """Test installing SSH key for non-existent user."""
-        mock_getpwnam.side_effect = KeyError("User not found")
+    def test_install_ssh_key_matches_key_not_comment(
+        self, temp_dir, user_manager, mocks, make_pw
+    ):
+        """Test duplicates are found by key type and data, ignoring comments."""
+        mock_user = make_pw(home=str(temp_dir))
+        mocks.getpwnam.return_value = mock_user
 
-        user_manager = UserManager()
+        authorized_keys = temp_dir / ".ssh" / "authorized_keys"
+        authorized_keys.parent.mkdir()
+        authorized_keys.write_text("ssh-rsa AAAAB3NzaC1yc2EAAAAD old@laptop\n")
+
+        # Same key with a different comment is already installed
+        user_manager.install_ssh_key(
+            "testuser", "ssh-rsa  AAAAB3NzaC1yc2EAAAAD new@laptop"
+        )
+        # A key that is a prefix of an installed key is a different key
+        user_manager.install_ssh_key("testuser", "ssh-rsa AAAAB3NzaC1yc2E")
+
+        assert authorized_keys.read_text().splitlines() == [
+            "ssh-rsa AAAAB3NzaC1yc2EAAAAD old@laptop",
+            "ssh-rsa AAAAB3NzaC1yc2E",
+        ]
+
+    def test_install_ssh_key_existing_ssh_dir(
+        self, temp_dir, user_manager, mocks, make_pw
+    ):
+        """Test an .ssh directory already owned by the user is left alone."""
+        mock_user = make_pw(home=str(temp_dir), uid=os.getuid(), gid=os.getgid())
+        mocks.getpwnam.return_value = mock_user
+        (temp_dir / ".ssh").mkdir(mode=0o700)
+
+        with patch.object(UserManager, "_setup_ssh_directory") as mock_setup:
+            user_manager.install_ssh_key("testuser", "ssh-rsa AAAAB3NzaC1yc2E")
+
+        mock_setup.assert_not_called()
+        # Only authorized_keys itself is chowned
+        mocks.chown.assert_called_once_with(
+            str(temp_dir / ".ssh" / "authorized_keys"), os.getuid(), os.getgid()
+        )
+
+    def test_install_ssh_key_user_not_found(self, user_manager, mocks):
+        """Test installing SSH key for non-existent user."""
+        mocks.getpwnam.side_effect = KeyError("User not found")
 
         with pytest.raises(RuntimeError, match="User testuser does not exist"):
             user_manager.install_ssh_key(
                 "testuser", "ssh-rsa AAAAB3... test@example.com"
             )
 
-    @patch("pathlib.Path.unlink")
-    @patch("pathlib.Path.exists")
-    @patch("pwd.getpwnam")
-    def test_remove_ssh_access_success(self, mock_getpwnam, mock_exists, mock_unlink):
-        """Test successful SSH access removal."""
-        # Mock user info
-        mock_user = Mock()
-        mock_user.pw_dir = "/home/testuser"
-        mock_getpwnam.return_value = mock_user
-        mock_exists.return_value = True
+    @pytest.mark.parametrize(
+        "user_found,unlink_error,unlink_called",
+        [
+            (True, None, True),
+            (True, FileNotFoundError("No such file"), True),
+            (False, None, False),
+        ],
+    )
+    def test_remove_ssh_access(
+        self, user_manager, mocks, make_pw, user_found, unlink_error, unlink_called
+    ):
+        """Test removing SSH access, with and without keys or the user."""
+        if user_found:
+            mocks.getpwnam.return_value = make_pw()
+        else:
+            mocks.getpwnam.side_effect = KeyError("User not found")
 
-        user_manager = UserManager()
-        user_manager.remove_ssh_access("testuser")
+        with patch.object(os, "unlink", side_effect=unlink_error) as mock_unlink:
+            user_manager.remove_ssh_access("testuser")  # Should not raise exception
 
-        mock_unlink.assert_called_once()
+        assert mock_unlink.called is unlink_called
 
-    @patch("pathlib.Path.exists")
-    @patch("pwd.getpwnam")
-    def test_remove_ssh_access_no_keys(self, mock_getpwnam, mock_exists):
-        """Test removing SSH access when no keys exist."""
-        # Mock user info
-        mock_user = Mock()
-        mock_user.pw_dir = "/home/testuser"
-        mock_getpwnam.return_value = mock_user
-        mock_exists.return_value = False
-
-        user_manager = UserManager()
-        user_manager.remove_ssh_access("testuser")  # Should not raise exception
-
-    @patch("pwd.getpwnam")
-    def test_remove_ssh_access_user_not_found(self, mock_getpwnam):
-        """Test removing SSH access for non-existent user."""
-        mock_getpwnam.side_effect = KeyError("User not found")
-
-        user_manager = UserManager()
-        user_manager.remove_ssh_access("nonexistent")  # Should not raise exception
-
-    @patch("builtins.open", create=True)
-    @patch("pathlib.Path.exists")
-    @patch("pwd.getpwnam")
-    def test_get_user_info_success(self, mock_getpwnam, mock_exists, mock_open):
+    def test_get_user_info_success(self, user_manager, mocks, make_pw):
         """Test getting user information successfully."""
         # Mock user info
-        mock_user = Mock()
-        mock_user.pw_uid = 1000
-        mock_user.pw_gid = 1000
-        mock_user.pw_dir = "/home/testuser"
-        mock_user.pw_shell = "/bin/bash"
-        mock_getpwnam.return_value = mock_user
-        mock_exists.return_value = True
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
 
         # Mock authorized_keys file with 2 keys
-        mock_file = MagicMock()
-        mock_file.__iter__.return_value = [
-            "ssh-rsa AAAAB3... key1",
-            "ssh-rsa AAAAB3... key2",
-            "# comment line",
-            "",
-        ]
-        mock_open.return_value.__enter__.return_value = mock_file
+        keys = (
+            b"ssh-rsa AAAAB3... key1\n"
+            b"ssh-rsa AAAAB3... key2\n"
+            b"# comment line\n"
+            b"\n"
+        )
 
-        user_manager = UserManager()
-        info = user_manager.get_user_info("testuser")
+        with patch.object(builtins, "open", mock_open(read_data=keys)):
+            info = user_manager.get_user_info("testuser")
 
         assert info is not None
         assert info["username"] == "testuser"
@@ -222,113 +363,130 @@ class TestUserManager:
         assert info["ssh_key_count"] == 2
         assert info["has_ssh_access"] is True
 
-    @patch("pwd.getpwnam")
-    def test_get_user_info_user_not_found(self, mock_getpwnam):
+    def test_get_user_info_no_authorized_keys(
+        self, temp_dir, user_manager, mocks, make_pw
+    ):
+        """Test user info for an account without an authorized_keys file."""
+        mock_user = make_pw(home=str(temp_dir))
+        mocks.getpwnam.return_value = mock_user
+
+        info = user_manager.get_user_info("testuser")
+
+        assert info["ssh_key_count"] == 0
+        assert info["has_ssh_access"] is False
+
+    def test_get_user_info_user_not_found(self, user_manager, mocks):
         """Test getting user info for non-existent user."""
-        mock_getpwnam.side_effect = KeyError("User not found")
+        mocks.getpwnam.side_effect = KeyError("User not found")
 
-        user_manager = UserManager()
         info = user_manager.get_user_info("nonexistent")
 
         assert info is None
 
-    @patch("pwd.getpwall")
-    def test_list_users_with_ssh(self, mock_getpwall):
+    def test_list_users_with_ssh(self, temp_dir, user_manager):
         """Test listing users with SSH access."""
-        # Mock multiple users
-        mock_users = []
-        for i, name in enumerate(["user1", "user2", "systemuser"]):
-            mock_user = Mock()
-            mock_user.pw_name = name
-            mock_user.pw_uid = 1000 + i
-            mock_user.pw_dir = f"/home/{name}"
-            mock_users.append(mock_user)
-
-        mock_getpwall.return_value = mock_users
-
-        def mock_path_exists(self):
-            path_str = str(self)
-            return "user1" in path_str or "user2" in path_str
-
-        with patch("pathlib.Path.exists", mock_path_exists):
-            user_manager = UserManager()
+        passwd_lines = ["root:x:0:0:root:/root:/bin/bash"]
+        for i, name in enumerate(["user1", "user2", "nokeys"]):
+            home_dir = temp_dir / name
+            if name != "nokeys":
+                (home_dir / ".ssh").mkdir(parents=True)
+                (home_dir / ".ssh" / "authorized_keys").write_text("ssh-rsa AAAA\n")
+            passwd_lines.append(f"{name}:x:{1000 + i}:1000::{home_dir}:/bin/bash")
+        passwd_lines.append("malformed line")
+
+        passwd_file = temp_dir / "passwd"
+        passwd_file.write_text("\n".join(passwd_lines) + "\n")
+
+        with patch.object(UserManager, "PASSWD_FILE", str(passwd_file)):
             users = user_manager.list_users_with_ssh()
 
             assert sorted(users) == ["user1", "user2"]
 
-    def test_validate_username_valid(self):
-        """Test validation of valid usernames."""
-        user_manager = UserManager()
-
-        assert user_manager.validate_username("alice") is True
-        assert user_manager.validate_username("user123") is True
-        assert user_manager.validate_username("test-user") is True
-        assert user_manager.validate_username("test_user") is True
-        assert user_manager.validate_username("user.name") is True
-
-    def test_validate_username_invalid(self):
-        """Test validation of invalid usernames."""
-        user_manager = UserManager()
-
-        assert user_manager.validate_username("") is False
-        assert user_manager.validate_username("-invalid") is False
-        assert user_manager.validate_username("_invalid") is False
-        assert user_manager.validate_username(".invalid") is False
-        assert user_manager.validate_username("user@invalid") is False
-        assert user_manager.validate_username("user space") is False
-        assert user_manager.validate_username("a" * 33) is False  # Too long
-
-    @patch("subprocess.run")
-    @patch("pwd.getpwnam")
-    def test_delete_user_success(self, mock_getpwnam, mock_subprocess):
+    @pytest.mark.parametrize("n", [3, 50, 500])
+    def test_list_users_with_ssh_many_users(
+        self, temp_dir, user_manager, monkeypatch, n
+    ):
+        """Test listing SSH users when homes are checked concurrently."""
+        passwd_lines = []
+        expected = []
+        for i in range(n):
+            name = f"user{i:03d}"
+            if i % 3 == 0:
+                expected.append(name)
+            passwd_lines.append(f"{name}:x:{1000 + i}:1000::/home/{name}:/bin/bash")
+
+        passwd_file = temp_dir / "passwd"
+        passwd_file.write_text("\n".join(passwd_lines) + "\n")
+
+        # Answer existence checks from a set instead of creating n homes
+        allowed = {f"/home/{name}/.ssh/authorized_keys" for name in expected}
+        monkeypatch.setattr(os.path, "exists", allowed.__contains__)
+
+        with patch.object(UserManager, "PASSWD_FILE", str(passwd_file)):
+            assert user_manager.list_users_with_ssh() == expected
+
+    @pytest.mark.parametrize(
+        "username,valid",
+        [
+            ("alice", True),
+            ("user123", True),
+            ("test-user", True),
+            ("test_user", True),
+            ("user.name", True),
+            ("a" * 32, True),
+            ("", False),
+            ("-invalid", False),
+            ("_invalid", False),
+            (".invalid", False),
+            ("user@invalid", False),
+            ("user space", False),
+            ("a" * 33, False),  # Too long
+            ("alice\n", False),
+            ("ålice", False),  # ASCII only
+        ],
+    )
+    def test_validate_username(self, user_manager, username, valid):
+        """Test validation of usernames."""
+        assert user_manager.validate_username(username) is valid
+
+    def test_delete_user_success(self, user_manager, mocks, make_pw):
         """Test successful user deletion."""
         # Mock user exists
-        mock_user = Mock()
-        mock_user.pw_name = "testuser"
-        mock_getpwnam.return_value = mock_user
-        mock_subprocess.return_value.returncode = 0
-        mock_subprocess.return_value.stdout = ""
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
+        mocks.run.return_value.returncode = 0
+        mocks.run.return_value.stdout = ""
 
-        user_manager = UserManager()
         user_manager.delete_user("testuser")
 
-        mock_subprocess.assert_called_once()
-        args = mock_subprocess.call_args[0][0]
+        assert mocks.run.call_count == 1
+        args = mocks.run.call_args.args[0]
         assert "userdel" in args
         assert "-r" in args
         assert "testuser" in args
 
-    @patch("pwd.getpwnam")
-    def test_delete_user_not_exists(self, mock_getpwnam):
+    def test_delete_user_not_exists(self, user_manager, mocks):
         """Test deleting user that doesn't exist."""
-        mock_getpwnam.side_effect = KeyError("User not found")
+        mocks.getpwnam.side_effect = KeyError("User not found")
 
-        user_manager = UserManager()
         # Should not raise exception
         user_manager.delete_user("nonexistent")
 
-    @patch("subprocess.run")
-    @patch("pwd.getpwnam")
-    def test_delete_user_failure_with_ssh_fallback(
-        self, mock_getpwnam, mock_subprocess
-    ):
+    def test_delete_user_failure_with_ssh_fallback(self, user_manager, mocks, make_pw):
         """Test user deletion failure with SSH removal fallback."""
         # Mock user exists
-        mock_user = Mock()
-        mock_user.pw_name = "testuser"
-        mock_user.pw_dir = "/home/testuser"
-        mock_getpwnam.return_value = mock_user
+        mock_user = make_pw()
+        mocks.getpwnam.return_value = mock_user
 
         # Mock userdel failure
-        mock_subprocess.side_effect = subprocess.CalledProcessError(
+        mocks.run.side_effect = subprocess.CalledProcessError(
             1, "userdel", stderr="User busy"
         )
 
         with patch.object(UserManager, "remove_ssh_access") as mock_remove_ssh:
-            user_manager = UserManager()
-
             with pytest.raises(RuntimeError, match="Failed to delete user"):
                 user_manager.delete_user("testuser")
 
             # Should attempt SSH removal as fallback
-            mock_remove_ssh.assert_called_once_with("testuser")
+            assert mock_remove_ssh.call_count == 1
+            assert mock_remove_ssh.call_args.args == ("testuser",)